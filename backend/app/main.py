@@ -1,42 +1,72 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse, HTMLResponse
+from fastapi.responses import JSONResponse, StreamingResponse, HTMLResponse, Response
+from starlette.concurrency import iterate_in_threadpool
 from typing import Any, Dict, List
+import json
 import numpy as np
 
 from .schemas.api import (
     SimulateRequest,
     StateRequest,
     AnalysisRequest,
+    JobRequest,
+    TrajectoryRequest,
+    UnitaryRequest,
     SimulateResponse,
     StateResponse,
     AnalysisResponse,
+    UnitaryResponse,
 )
 from .services.simulator import (
     simulate_statevector,
+    evolve_statevector,
+    resolve_dtype,
     simulate_counts,
     compute_density_matrix,
     build_noise_model,
-    compute_expectations_xyz,
     compute_single_qubit_bloch_vectors,
-    analyze_circuit_properties,
     compute_circuit_fidelity,
+    compute_state_analytics,
+    plan_method,
+    DENSE_MAX_QUBITS,
 )
+from .services.observables import pauli_sum_expectation
+from .services.out_of_core import run_out_of_core
+from .services.histogram import histogram_counts
+from .services.mps import run_mps, summarize_mps, compute_mps_analytics
+from .services.trajectory import iter_trajectory
+from .services.coalescing import SingleFlight, ClientDisconnected, request_key, wait_for_disconnect
+from .services.unitary import (
+    UNITARY_RETURN_MAX_QUBITS,
+    unitary_cache,
+    apply_unitary,
+    process_fidelity,
+    average_gate_fidelity,
+)
+from .services.jobs import job_store
 from .services.bloch_visualizer import generate_bloch_sphere_image, generate_interactive_bloch_html
 from .routers.tutorials import router as tutorials_router
 from .routers.export import router as export_router
+from .routers.imports import router as import_router
 
 
 def create_app() -> FastAPI:
     app = FastAPI(title="QSV - Quantum State Visualizer API", version="0.1.0")
+    simulate_flights = SingleFlight("simulate")
+    analysis_flights = SingleFlight("analysis")
 
     def _complex_to_pair_list(values):
+        if isinstance(values, np.ndarray):
+            return np.stack([values.real, values.imag], axis=-1).tolist()
         try:
             return [[float(x.real), float(x.imag)] for x in values]
         except Exception:
             return values
 
     def _complex_matrix_to_pair_list(matrix):
+        if isinstance(matrix, np.ndarray):
+            return np.stack([matrix.real, matrix.imag], axis=-1).tolist()
         try:
             return [[[float(x.real), float(x.imag)] for x in row] for row in matrix]
         except Exception:
@@ -52,6 +82,7 @@ def create_app() -> FastAPI:
 
     app.include_router(tutorials_router)
     app.include_router(export_router)
+    app.include_router(import_router)
 
     @app.get("/")
     async def root() -> Dict[str, str]:
@@ -61,30 +92,65 @@ def create_app() -> FastAPI:
     async def health() -> Dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/api/metrics")
+    async def metrics() -> Dict[str, Any]:
+        return {"coalescing": {f.name: f.stats() for f in (simulate_flights, analysis_flights)}}
+
+    async def _coalesced(flights: SingleFlight, key: str, fn, request: Request) -> Response:
+        """Share one run of ``fn`` (returning a JSON body) among identical concurrent requests."""
+        try:
+            body = await flights.run(key, fn, lambda: wait_for_disconnect(request.receive))
+        except ClientDisconnected:
+            return Response(status_code=499)
+        return Response(content=body, media_type="application/json")
+
     @app.post("/api/simulate", response_model=SimulateResponse)
-    async def simulate(req: SimulateRequest) -> JSONResponse:
+    async def simulate(req: SimulateRequest, request: Request) -> Response:
         num_qubits = req.circuit.qubits
         gates = req.circuit.gates
 
-        statevector, probabilities = simulate_statevector(num_qubits, gates)
-        counts: Dict[str, int] = {}
-        if req.shots and req.shots > 0:
-            counts = simulate_counts(num_qubits, gates, req.shots)
-
-        return JSONResponse(
-            {
-                "statevector": _complex_to_pair_list(statevector),
-                "probabilities": probabilities,
-                "measurement_counts": counts,
-                "analytics": {},
-            }
+        def run() -> bytes:
+            statevector = evolve_statevector(num_qubits, gates, req.precision)
+            probabilities = np.abs(statevector) ** 2
+            counts: Dict[str, int] = {}
+            histogram = None
+            if req.shots and req.shots > 0 and req.histogram is not None:
+                try:
+                    histogram = histogram_counts(
+                        num_qubits, gates, req.shots,
+                        marginal_qubits=req.histogram.marginal_qubits,
+                        top_k=req.histogram.top_k,
+                        bins=req.histogram.bins,
+                        probabilities=probabilities,
+                        seed=req.seed,
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            elif req.shots and req.shots > 0:
+                counts = simulate_counts(num_qubits, gates, req.shots, seed=req.seed)
+
+            return JSONResponse(
+                {
+                    "statevector": _complex_to_pair_list(statevector),
+                    "probabilities": probabilities.tolist(),
+                    "measurement_counts": counts,
+                    "histogram": histogram,
+                    "analytics": {},
+                }
+            ).body
+
+        key = request_key(
+            "simulate", num_qubits, gates,
+            shots=req.shots, seed=req.seed, precision=resolve_dtype(req.precision).__name__,
+            histogram=req.histogram.model_dump() if req.histogram else None,
         )
+        return await _coalesced(simulate_flights, key, run, request)
 
     @app.post("/api/state", response_model=StateResponse)
     async def state(req: StateRequest) -> JSONResponse:
         num_qubits = req.circuit.qubits
         gates = req.circuit.gates
-        statevector, _ = simulate_statevector(num_qubits, gates)
+        statevector = evolve_statevector(num_qubits, gates, req.precision)
         density_matrix = compute_density_matrix(statevector)
         return JSONResponse({
             "statevector": _complex_to_pair_list(statevector),
@@ -92,51 +158,178 @@ def create_app() -> FastAPI:
         })
 
     @app.post("/api/analysis", response_model=AnalysisResponse)
-    async def analysis(req: AnalysisRequest) -> JSONResponse:
+    async def analysis(req: AnalysisRequest, request: Request) -> Response:
         num_qubits = req.circuit.qubits
         gates = req.circuit.gates
-        statevector, _ = simulate_statevector(num_qubits, gates)
-
-        analytics: Dict[str, Any] = {
-            "fidelity": None,
-            "expectation_values": {},
-            "entanglement_entropy": None,
-        }
-
-        if req.target_statevector:
-            sv = np.array(statevector, dtype=np.complex128)
-            tv = np.array(req.target_statevector, dtype=np.complex128)
-            tv = tv / (np.linalg.norm(tv) + 1e-12)
-            sv = sv / (np.linalg.norm(sv) + 1e-12)
-            fidelity = float(np.abs(np.vdot(tv, sv)) ** 2)
-            analytics["fidelity"] = fidelity
-
-        analytics["expectation_values"] = compute_expectations_xyz(statevector, num_qubits)
-        analytics["bloch_vectors"] = compute_single_qubit_bloch_vectors(statevector, num_qubits)
-        
-        # Enhanced circuit analysis
-        circuit_analysis = analyze_circuit_properties(statevector, num_qubits)
-        analytics["entanglement_entropies"] = circuit_analysis["entanglement_entropies"]
-        analytics["participation_ratio"] = circuit_analysis["participation_ratio"]
-
-        if req.noise:
-            nm = build_noise_model(
-                req.noise.bit_flip_prob,
-                req.noise.depolarizing_prob,
-                req.noise.amplitude_damping_gamma,
+
+        try:
+            method = plan_method(num_qubits, req.method)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        mps_options = req.mps.model_dump() if req.mps else {}
+        if method == "mps" and (req.target_statevector or req.observable or req.noise):
+            raise HTTPException(
+                status_code=400,
+                detail="target_statevector, observable and noise need method 'statevector'",
             )
-            noisy_counts = simulate_counts(num_qubits, gates, shots=1024, noise_model=nm) if nm else {}
-            analytics["noisy_counts_preview"] = noisy_counts
 
-        return JSONResponse({"analytics": analytics})
+        def run() -> bytes:
+            if method == "mps":
+                try:
+                    state = run_mps(
+                        num_qubits, gates, dtype=resolve_dtype(req.precision),
+                        max_bond=mps_options.get("max_bond_dimension"),
+                        threshold=mps_options.get("truncation_threshold"),
+                        seed=req.seed,
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                analytics = compute_mps_analytics(state)
+                statevector = None
+            else:
+                statevector = evolve_statevector(num_qubits, gates, req.precision)
+                analytics = compute_state_analytics(statevector, num_qubits)
+
+            if req.target_statevector:
+                fidelity = compute_circuit_fidelity(
+                    statevector, req.target_statevector, dtype=resolve_dtype(req.precision)
+                )
+                analytics["fidelity"] = fidelity
+
+            if req.observable:
+                try:
+                    analytics["observable"] = pauli_sum_expectation(
+                        statevector, num_qubits, [t.model_dump() for t in req.observable]
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+
+            if req.noise:
+                nm = build_noise_model(
+                    req.noise.bit_flip_prob,
+                    req.noise.depolarizing_prob,
+                    req.noise.amplitude_damping_gamma,
+                )
+                noisy_counts = simulate_counts(num_qubits, gates, shots=1024, noise_model=nm, seed=req.seed) if nm else {}
+                analytics["noisy_counts_preview"] = noisy_counts
+
+            return JSONResponse({"analytics": analytics}).body
+
+        key = request_key(
+            "analysis", num_qubits, gates,
+            precision=resolve_dtype(req.precision).__name__,
+            seed=req.seed,
+            method=method,
+            mps=mps_options,
+            noise=req.noise.model_dump() if req.noise else None,
+            target_statevector=req.target_statevector,
+            observable=[t.model_dump() for t in req.observable] if req.observable else None,
+        )
+        return await _coalesced(analysis_flights, key, run, request)
+
+    @app.post("/api/trajectory")
+    async def trajectory(req: TrajectoryRequest, request: Request) -> StreamingResponse:
+        """Stream one NDJSON frame per step group from a single simulation."""
+        # Checked before streaming: once the 200 is sent, errors can only truncate the body.
+        if req.circuit.qubits > DENSE_MAX_QUBITS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Trajectories are limited to {DENSE_MAX_QUBITS} qubits",
+            )
+        frames = iter_trajectory(
+            req.circuit.qubits,
+            req.circuit.gates,
+            outputs=req.outputs,
+            every=req.every,
+            max_frames=req.max_frames,
+            dtype=resolve_dtype(req.precision),
+        )
+
+        async def ndjson():
+            # Frames are computed in a worker thread one at a time, so a
+            # client that goes away stops the simulation at the next step.
+            async for frame in iterate_in_threadpool(frames):
+                if await request.is_disconnected():
+                    break
+                yield json.dumps(frame) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    @app.post("/api/unitary", response_model=UnitaryResponse)
+    def unitary(req: UnitaryRequest) -> JSONResponse:
+        # Sync so FastAPI runs it in the threadpool: building and encoding a
+        # large unitary takes seconds and must not block the event loop.
+        num_qubits = req.circuit.qubits
+        dtype = resolve_dtype(req.precision)
+        try:
+            digest, matrix, cached = unitary_cache.get(num_qubits, req.circuit.gates, dtype)
+            result: Dict[str, Any] = {
+                "circuit_hash": digest,
+                "num_qubits": num_qubits,
+                "cached": cached,
+            }
+            return_matrix = req.return_matrix
+            if return_matrix is None:
+                return_matrix = num_qubits <= UNITARY_RETURN_MAX_QUBITS
+            if return_matrix:
+                result["unitary"] = _complex_matrix_to_pair_list(matrix)
+            if req.input_states:
+                result["output_states"] = _complex_matrix_to_pair_list(apply_unitary(matrix, req.input_states))
+            if req.target_circuit is not None:
+                if req.target_circuit.qubits != num_qubits:
+                    raise ValueError("target_circuit must have the same number of qubits")
+                _, target, _ = unitary_cache.get(num_qubits, req.target_circuit.gates, dtype)
+                result["process_fidelity"] = process_fidelity(matrix, target)
+                result["average_gate_fidelity"] = average_gate_fidelity(matrix, target)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return JSONResponse(result)
 
     @app.post("/api/submit")
-    async def submit_job(payload: Dict[str, Any]) -> JSONResponse:
-        return JSONResponse({"job_id": "demo-job-id"})
+    async def submit_job(req: JobRequest) -> JSONResponse:
+        # Out-of-core state lives on disk, so it defaults to single precision;
+        # MPS jobs use the server default like /api/analysis.
+        dtype = resolve_dtype(req.precision or ("single" if req.mode == "out_of_core" else None))
+
+        def run() -> Dict[str, Any]:
+            if req.mode == "mps":
+                options = req.mps.model_dump() if req.mps else {}
+                state = run_mps(
+                    req.circuit.qubits,
+                    req.circuit.gates,
+                    dtype=dtype,
+                    max_bond=options.get("max_bond_dimension"),
+                    threshold=options.get("truncation_threshold"),
+                    seed=req.seed,
+                )
+                return summarize_mps(
+                    state,
+                    shots=req.shots,
+                    marginal_qubits=req.marginal_qubits,
+                    bloch=req.bloch,
+                    seed=req.seed,
+                )
+            return run_out_of_core(
+                req.circuit.qubits,
+                req.circuit.gates,
+                dtype=dtype,
+                memory_cap_mb=req.memory_cap_mb,
+                top_k=req.top_k,
+                marginal_qubits=req.marginal_qubits,
+                shots=req.shots,
+                bloch=req.bloch,
+                seed=req.seed,
+            )
+
+        job_id = job_store.submit(req.mode, run)
+        return JSONResponse({"job_id": job_id, "status": "queued"})
 
     @app.get("/api/job/{job_id}")
     async def job_status(job_id: str) -> JSONResponse:
-        return JSONResponse({"job_id": job_id, "status": "completed", "result": {}})
+        record = job_store.get(job_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return JSONResponse(record)
 
     @app.get("/api/bloch-sphere-html")
     async def get_bloch_sphere_html(num_qubits: int = 1, gates: str = "[]") -> HTMLResponse:
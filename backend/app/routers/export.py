@@ -1,7 +1,9 @@
+import os
 from fastapi import APIRouter
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
 from ..schemas.api import CircuitPayload
 from ..services.simulator import build_qiskit_circuit
+from ..services.qasm import iter_qasm
 
 try:
     from qiskit.qasm2 import dumps as qasm2_dumps  # Qiskit >= 1.0
@@ -10,9 +12,26 @@ except Exception:  # pragma: no cover
 
 router = APIRouter(prefix="/api/export", tags=["export"])
 
+# Payloads with at least this many gates are written directly, line by line,
+# instead of going through a Qiskit circuit.
+STREAM_MIN_GATES = int(os.environ.get("QSV_QASM_STREAM_MIN_GATES", 2000))
+
+
+def _batched(lines, size: int = 1000):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
 
 @router.post("/qasm", response_class=PlainTextResponse)
-async def export_qasm(payload: CircuitPayload) -> str:
+async def export_qasm(payload: CircuitPayload, stream: bool = False):
+    if stream or len(payload.gates) >= STREAM_MIN_GATES:
+        return StreamingResponse(_batched(iter_qasm(payload.qubits, payload.gates)), media_type="text/plain")
     qc = build_qiskit_circuit(payload.qubits, payload.gates)
     if qasm2_dumps:
         return qasm2_dumps(qc)
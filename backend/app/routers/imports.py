@@ -0,0 +1,27 @@
+import codecs
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from ..services.qasm import QasmParser
+
+router = APIRouter(prefix="/api/import", tags=["import"])
+
+
+@router.post("/qasm", response_class=JSONResponse)
+async def import_qasm(request: Request):
+    """Parse an OpenQASM 2 request body into a CircuitPayload as it streams in."""
+    parser = QasmParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    # Chunks are parsed in a worker thread so large files do not block the event loop.
+    async for chunk in request.stream():
+        await run_in_threadpool(parser.feed, decoder.decode(chunk))
+        if len(parser.errors) >= parser.max_errors:
+            break
+    parser.feed(decoder.decode(b"", final=True))
+    circuit = await run_in_threadpool(parser.close)
+    if parser.errors:
+        raise HTTPException(
+            status_code=400,
+            detail={"errors": [{"line": e.line, "message": e.message} for e in parser.errors]},
+        )
+    return JSONResponse(circuit)
@@ -1,29 +1,148 @@
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Dict, Any, Tuple
+import hashlib
 import json
-from fastapi import APIRouter, HTTPException
+import logging
+import os
+import threading
+import time
+from fastapi import APIRouter, HTTPException, Request, Response
 
-router = APIRouter(prefix="/api/tutorials", tags=["tutorials"])
+from ..services.simulator import evolve_statevector, simulate_counts, compute_state_analytics
+
+logger = logging.getLogger(__name__)
 
 EXAMPLES_DIR = Path(__file__).resolve().parents[2] / "examples"
+# How often the examples directory is checked for edits.
+POLL_SECONDS = float(os.environ.get("QSV_TUTORIAL_POLL_SECONDS", 2.0))
+TUTORIAL_SHOTS = int(os.environ.get("QSV_TUTORIAL_SHOTS", 1024))
+# Fixed so unchanged tutorials keep the same counts, and ETag, across rebuilds and restarts.
+TUTORIAL_SEED = 1234
+
+
+def _precompute(circuit: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything the frontend would otherwise request from /api/simulate and /api/analysis."""
+    num_qubits = circuit["qubits"]
+    gates = circuit.get("gates", [])
+    statevector = evolve_statevector(num_qubits, gates)
+    return {
+        "statevector": [[float(x.real), float(x.imag)] for x in statevector],
+        "probabilities": (abs(statevector) ** 2).tolist(),
+        "measurement_counts": simulate_counts(num_qubits, gates, TUTORIAL_SHOTS, seed=TUTORIAL_SEED),
+        "analytics": compute_state_analytics(statevector, num_qubits),
+    }
+
+
+def _entry(body: Any) -> Tuple[bytes, str]:
+    payload = json.dumps(body).encode()
+    return payload, '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+
+class TutorialCatalogue:
+    """The manifest and tutorials, with precomputed results, held in memory.
+
+    The examples directory is re-scanned at most every ``POLL_SECONDS``; if any
+    file was added, removed or modified the catalogue is rebuilt in a
+    background thread and swapped in when done, while requests keep getting
+    the previous build. A file that fails to load keeps its last good entry
+    (or is left out) and the error is logged. Serialized bodies and their
+    ETags are computed once per build.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshot: Dict[str, float] | None = None
+        self._checked_at = 0.0
+        self._building = False
+        self._manifest: Tuple[bytes, str] = _entry([])
+        self._tutorials: Dict[str, Tuple[bytes, str]] = {}
+
+    def _scan(self) -> Dict[str, float]:
+        if not self.directory.exists():
+            return {}
+        return {p.name: p.stat().st_mtime for p in self.directory.glob("*.json")}
+
+    def _build(self) -> None:
+        manifest = self._manifest
+        manifest_path = self.directory / "manifest.json"
+        try:
+            manifest = _entry(json.loads(manifest_path.read_text()) if manifest_path.exists() else [])
+        except Exception:
+            logger.exception("Keeping the previous tutorial manifest; %s failed to load", manifest_path)
+        tutorials: Dict[str, Tuple[bytes, str]] = {}
+        for path in self.directory.glob("*.json"):
+            if path.name == "manifest.json":
+                continue
+            try:
+                data = json.loads(path.read_text())
+                if isinstance(data.get("circuit"), dict):
+                    data["results"] = _precompute(data["circuit"])
+                tutorials[path.stem] = _entry(data)
+            except Exception:
+                logger.exception("Tutorial %s failed to load", path)
+                if path.stem in self._tutorials:
+                    tutorials[path.stem] = self._tutorials[path.stem]
+        self._manifest = manifest
+        self._tutorials = tutorials
+
+    def _rebuild(self) -> None:
+        try:
+            self._build()
+        finally:
+            self._building = False
+
+    def refresh(self, force: bool = False) -> None:
+        """Start a rebuild if the directory changed; ``force`` rebuilds now, in the caller's thread."""
+        now = time.monotonic()
+        if not force and self._snapshot is not None and now - self._checked_at < POLL_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = now
+            snapshot = self._scan()
+            if force or self._snapshot is None:
+                self._snapshot = snapshot
+                self._build()
+            elif snapshot != self._snapshot and not self._building:
+                # Recorded up front, so a broken file is not retried on every poll.
+                self._snapshot = snapshot
+                self._building = True
+                threading.Thread(target=self._rebuild, name="tutorial-catalogue", daemon=True).start()
+
+    def manifest(self) -> Tuple[bytes, str]:
+        self.refresh()
+        return self._manifest
+
+    def tutorial(self, tutorial_id: str) -> Tuple[bytes, str] | None:
+        self.refresh()
+        return self._tutorials.get(tutorial_id)
+
+
+catalogue = TutorialCatalogue(EXAMPLES_DIR)
+
+router = APIRouter(
+    prefix="/api/tutorials",
+    tags=["tutorials"],
+    on_startup=[lambda: catalogue.refresh(force=True)],
+)
 
 
-def _load_manifest() -> List[Dict[str, Any]]:
-    manifest_path = EXAMPLES_DIR / "manifest.json"
-    if not manifest_path.exists():
-        return []
-    return json.loads(manifest_path.read_text())
+def _cached_response(request: Request, entry: Tuple[bytes, str]) -> Response:
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/")
-async def list_tutorials() -> List[Dict[str, Any]]:
-    return _load_manifest()
+async def list_tutorials(request: Request) -> Response:
+    return _cached_response(request, catalogue.manifest())
 
 
 @router.get("/{tutorial_id}")
-async def get_tutorial(tutorial_id: str) -> Dict[str, Any]:
-    file_path = EXAMPLES_DIR / f"{tutorial_id}.json"
-    if not file_path.exists():
+async def get_tutorial(tutorial_id: str, request: Request) -> Response:
+    entry = catalogue.tutorial(tutorial_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Tutorial not found")
-    data = json.loads(file_path.read_text())
-    return data
+    return _cached_response(request, entry)
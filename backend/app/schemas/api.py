@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 
 class CircuitPayload(BaseModel):
@@ -8,13 +8,41 @@ class CircuitPayload(BaseModel):
     # gates: { name: str, targets: List[int], controls?: List[int], params?: List[float], step?: int }
 
 
+# "single" simulates in complex64/float32; None uses the server default (QSV_PRECISION).
+Precision = Literal["single", "double"]
+
+# "auto" lets the planner pick: dense statevector for small circuits, MPS above QSV_DENSE_MAX_QUBITS.
+Method = Literal["auto", "statevector", "mps"]
+
+
+class MPSOptions(BaseModel):
+    # None uses the server defaults (QSV_MPS_MAX_BOND, QSV_MPS_TRUNCATION)
+    max_bond_dimension: Optional[int] = Field(None, ge=1, le=4096)
+    # Largest discarded weight (sum of squared singular values) allowed per split
+    truncation_threshold: Optional[float] = Field(None, ge=0.0, lt=1.0)
+
+
+class HistogramOptions(BaseModel):
+    # Count only these qubits; bit j of each outcome is marginal_qubits[j]
+    marginal_qubits: Optional[List[int]] = Field(None, max_length=62)
+    # Keep the top_k most frequent outcomes and lump the rest into "other"
+    top_k: Optional[int] = Field(None, ge=0, le=4096)
+    # Or split the outcome range into equal-width bins
+    bins: Optional[int] = Field(None, ge=1, le=4096)
+
+
 class SimulateRequest(BaseModel):
     circuit: CircuitPayload
     shots: int = 0
+    precision: Optional[Precision] = None
+    seed: Optional[int] = None
+    # Aggregate counts into integer-keyed arrays instead of measurement_counts
+    histogram: Optional[HistogramOptions] = None
 
 
 class StateRequest(BaseModel):
     circuit: CircuitPayload
+    precision: Optional[Precision] = None
 
 
 class NoiseOptions(BaseModel):
@@ -23,16 +51,67 @@ class NoiseOptions(BaseModel):
     amplitude_damping_gamma: float | None = None
 
 
+class PauliTerm(BaseModel):
+    # "ZZI" with the rightmost character on qubit 0, or one character per entry of qubits
+    pauli: str
+    coeff: float = 1.0
+    qubits: Optional[List[int]] = None
+
+
 class AnalysisRequest(BaseModel):
     circuit: CircuitPayload
     target_statevector: Optional[List[complex]] = None
     noise: Optional[NoiseOptions] = None
+    precision: Optional[Precision] = None
+    # Weighted Pauli sum, e.g. a Hamiltonian; its energy is returned as analytics.observable
+    observable: Optional[List[PauliTerm]] = None
+    seed: Optional[int] = None
+    method: Optional[Method] = None
+    mps: Optional[MPSOptions] = None
+
+
+class TrajectoryRequest(BaseModel):
+    circuit: CircuitPayload
+    precision: Optional[Precision] = None
+    outputs: List[Literal["probabilities", "bloch_vectors", "entropies", "statevector"]] = Field(
+        default_factory=lambda: ["probabilities", "bloch_vectors"]
+    )
+    # Emit a frame every `every` steps, or spread at most `max_frames` frames over the circuit.
+    every: int = Field(1, ge=1)
+    max_frames: Optional[int] = Field(None, ge=2)
+
+
+class UnitaryRequest(BaseModel):
+    circuit: CircuitPayload
+    precision: Optional[Precision] = None
+    # Each input statevector is mapped through the unitary; all in one matmul.
+    input_states: Optional[List[List[complex]]] = None
+    # Process and average gate fidelity of circuit against target_circuit.
+    target_circuit: Optional[CircuitPayload] = None
+    # None returns the matrix only up to QSV_UNITARY_RETURN_MAX_QUBITS; at 12 qubits it is hundreds of MB of JSON
+    return_matrix: Optional[bool] = None
+
+
+class JobRequest(BaseModel):
+    circuit: CircuitPayload
+    # "out_of_core" keeps the statevector in a memory-mapped file (complex64 unless precision says otherwise);
+    # "mps" runs the matrix product state engine (server default precision; top_k does not apply)
+    mode: Literal["out_of_core", "mps"] = "out_of_core"
+    precision: Optional[Precision] = None
+    memory_cap_mb: Optional[int] = Field(None, ge=1)
+    top_k: int = Field(16, ge=0, le=4096)
+    marginal_qubits: Optional[List[int]] = Field(None, max_length=20)
+    shots: int = Field(0, ge=0)
+    bloch: bool = True
+    seed: Optional[int] = None
+    mps: Optional[MPSOptions] = None
 
 
 class SimulateResponse(BaseModel):
     statevector: List[complex]
     probabilities: List[float]
     measurement_counts: Dict[str, int]
+    histogram: Optional[Dict[str, Any]] = None
     analytics: Dict[str, Any]
 
 
@@ -43,3 +122,13 @@ class StateResponse(BaseModel):
 
 class AnalysisResponse(BaseModel):
     analytics: Dict[str, Any]
+
+
+class UnitaryResponse(BaseModel):
+    circuit_hash: str
+    num_qubits: int
+    cached: bool
+    unitary: Optional[List[List[complex]]] = None
+    output_states: Optional[List[List[complex]]] = None
+    process_fidelity: Optional[float] = None
+    average_gate_fidelity: Optional[float] = None
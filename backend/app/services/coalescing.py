@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List
+
+from .simulator import circuit_hash
+
+
+class ClientDisconnected(Exception):
+    """The waiting client went away before the shared result was ready."""
+
+
+def request_key(kind: str, num_qubits: int, gates: List[Dict[str, Any]], **options: Any) -> str:
+    """Canonical key of a request: endpoint, circuit hash and every option that affects the result."""
+    blob = json.dumps(
+        {"kind": kind, "circuit": circuit_hash(num_qubits, gates), "options": options},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class _Call:
+    def __init__(self, future: "asyncio.Future[Any]"):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run one computation per key at a time and share its result with every concurrent caller.
+
+    The computation runs in the event loop's default executor. When every
+    caller waiting on it has disconnected, the computation is cancelled: if it
+    has not started it never runs, otherwise its result is dropped.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self.requests = 0
+        self.executions = 0
+        self.cancelled = 0
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        disconnected: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        self.requests += 1
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.get_running_loop().run_in_executor(None, fn))
+            self._calls[key] = call
+            self.executions += 1
+            call.future.add_done_callback(lambda _: self._forget(key, call))
+        call.waiters += 1
+        watcher = asyncio.ensure_future(disconnected()) if disconnected is not None else None
+        try:
+            waiting = {call.future} if watcher is None else {call.future, watcher}
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if not call.future.done():
+                raise ClientDisconnected()
+            return call.future.result()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            call.waiters -= 1
+            if call.waiters == 0 and not call.future.done():
+                call.future.cancel()
+                self.cancelled += 1
+                self._forget(key, call)
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        coalesced = self.requests - self.executions
+        return {
+            "requests": self.requests,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._calls),
+            "coalescing_ratio": coalesced / self.requests if self.requests else 0.0,
+        }
+
+
+async def wait_for_disconnect(receive: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+    """Return once the ASGI server reports that the client closed the connection."""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
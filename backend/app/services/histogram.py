@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .simulator import prepare_counts_circuit, run_counts
+
+
+# Shots per Aer run when counts have to come from a shot-by-shot simulation.
+HISTOGRAM_BATCH_SHOTS = int(os.environ.get("QSV_HISTOGRAM_BATCH_SHOTS", 100_000))
+# Outcome spaces up to 2**HISTOGRAM_DENSE_BITS are counted in a flat array, larger ones sparsely.
+HISTOGRAM_DENSE_BITS = 20
+# Outcomes are int64 indices.
+HISTOGRAM_MAX_BITS = 62
+
+
+def marginal_index(outcomes: np.ndarray, qubits: Sequence[int]) -> np.ndarray:
+    """Outcome indices restricted to ``qubits``; bit ``j`` of the result is ``qubits[j]``."""
+    index = np.zeros(outcomes.shape, dtype=np.int64)
+    for j, q in enumerate(qubits):
+        index |= ((outcomes >> q) & 1) << j
+    return index
+
+
+class CountAggregator:
+    """Running histogram of integer outcomes over ``qubits``.
+
+    Batches of ``(outcomes, counts)`` are reduced to the ``qubits`` marginal as
+    they arrive, so memory is bounded by the number of distinct marginal
+    outcomes, never by the number of shots.
+    """
+
+    def __init__(self, num_qubits: int, qubits: Sequence[int] | None = None):
+        self.num_qubits = num_qubits
+        self.qubits = list(range(num_qubits)) if qubits is None else list(qubits)
+        if any(q < 0 or q >= num_qubits for q in self.qubits):
+            raise ValueError("marginal_qubits must be qubit indices of the circuit")
+        if len(set(self.qubits)) != len(self.qubits):
+            raise ValueError("marginal_qubits must not repeat a qubit")
+        if len(self.qubits) > HISTOGRAM_MAX_BITS:
+            raise ValueError(f"Histograms are limited to {HISTOGRAM_MAX_BITS} qubits; use marginal_qubits")
+        self._marginal = self.qubits != list(range(num_qubits))
+        self.num_bits = len(self.qubits)
+        self.shots = 0
+        self._dense: np.ndarray | None = None
+        if self.num_bits <= HISTOGRAM_DENSE_BITS:
+            self._dense = np.zeros(2 ** self.num_bits, dtype=np.int64)
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._values = np.zeros(0, dtype=np.int64)
+
+    def add(self, outcomes: np.ndarray, counts: np.ndarray, reduced: bool = False) -> None:
+        """Add ``counts[i]`` shots of ``outcomes[i]``; ``reduced`` outcomes are already over ``qubits``."""
+        outcomes = np.asarray(outcomes, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+        if self._marginal and not reduced:
+            outcomes = marginal_index(outcomes, self.qubits)
+        self.shots += int(counts.sum())
+        if self._dense is not None:
+            np.add.at(self._dense, outcomes, counts)
+            return
+        keys, inverse = np.unique(np.concatenate([self._keys, outcomes]), return_inverse=True)
+        values = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(values, inverse, np.concatenate([self._values, counts]))
+        self._keys, self._values = keys, values
+
+    def add_counts(self, counts: Dict[str, int]) -> None:
+        """Add a bitstring-keyed counts dict, as returned by Aer."""
+        if not counts:
+            return
+        outcomes = np.fromiter((int(k.replace(' ', ''), 2) for k in counts), dtype=np.int64, count=len(counts))
+        self.add(outcomes, np.fromiter(counts.values(), dtype=np.int64, count=len(counts)))
+
+    def items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Observed outcomes in increasing order and their counts."""
+        if self._dense is not None:
+            keys = np.flatnonzero(self._dense)
+            return keys.astype(np.int64), self._dense[keys]
+        return self._keys, self._values
+
+    def result(self, top_k: int | None = None, bins: int | None = None) -> Dict[str, Any]:
+        """Compact histogram: outcome/count arrays, the ``top_k`` outcomes plus ``other``, or ``bins`` equal-width bins."""
+        keys, values = self.items()
+        out: Dict[str, Any] = {"shots": self.shots, "qubits": self.qubits}
+        if bins:
+            width = -(-(2 ** self.num_bits) // bins)
+            out["bin_width"] = width
+            out["counts"] = np.bincount(keys // width, weights=values, minlength=bins).astype(np.int64).tolist()
+            return out
+        if top_k is not None and top_k < len(keys):
+            top = np.argpartition(-values, top_k - 1)[:top_k] if top_k else np.zeros(0, dtype=np.int64)
+            top = top[np.lexsort((keys[top], -values[top]))]
+            keys, values = keys[top], values[top]
+            out["other"] = int(self.shots - values.sum())
+        else:
+            order = np.lexsort((keys, -values))
+            keys, values = keys[order], values[order]
+            if top_k is not None:
+                out["other"] = 0
+        out["outcomes"] = keys.tolist()
+        out["counts"] = values.tolist()
+        return out
+
+
+def counts_from_probabilities(
+    probabilities: np.ndarray,
+    shots: int,
+    aggregator: CountAggregator,
+    rng: np.random.Generator,
+) -> None:
+    """Exact shot counts for measuring every qubit of a state with these probabilities.
+
+    The distribution is reduced to the aggregator's qubits first and sampled
+    with one multinomial draw, which costs the same for 10 or 10**9 shots.
+    """
+    p = np.asarray(probabilities, dtype=np.float64)
+    if aggregator._marginal:
+        outcomes = np.arange(len(p), dtype=np.int64)
+        p = np.bincount(marginal_index(outcomes, aggregator.qubits), weights=p, minlength=2 ** aggregator.num_bits)
+    counts = rng.multinomial(shots, p / p.sum())
+    nonzero = np.flatnonzero(counts)
+    aggregator.add(nonzero, counts[nonzero], reduced=True)
+
+
+def has_measurements(gates: List[Dict[str, Any]]) -> bool:
+    return any(str(g.get('name', '')).upper() in {"MEASURE", "RESET"} for g in gates)
+
+
+def histogram_counts(
+    num_qubits: int,
+    gates: List[Dict[str, Any]],
+    shots: int,
+    marginal_qubits: List[int] | None = None,
+    top_k: int | None = None,
+    bins: int | None = None,
+    probabilities: np.ndarray | None = None,
+    noise_model: Any = None,
+    seed: int | None = None,
+) -> Dict[str, Any]:
+    """Aggregated measurement counts for ``shots`` runs of the circuit.
+
+    Noise-free circuits without MEASURE/RESET sample the final
+    ``probabilities`` directly, measuring every qubit. Otherwise Aer runs the
+    circuit in batches of ``HISTOGRAM_BATCH_SHOTS`` and each batch is folded
+    into the histogram before the next one starts. The circuit is built and
+    transpiled once; bits come from its MEASURE gates, or from measuring every
+    qubit at the end if it has none.
+    """
+    if top_k is not None and bins:
+        raise ValueError("Use either top_k or bins, not both")
+    aggregator = CountAggregator(num_qubits, marginal_qubits)
+    if probabilities is not None and noise_model is None and not has_measurements(gates):
+        counts_from_probabilities(probabilities, shots, aggregator, np.random.default_rng(seed))
+    else:
+        # Without MEASURE gates every qubit is measured, as on the probabilities path.
+        backend, tqc = prepare_counts_circuit(num_qubits, gates, noise_model, measure_all=True)
+        remaining, batch_index = shots, 0
+        while remaining > 0:
+            size = min(remaining, HISTOGRAM_BATCH_SHOTS)
+            batch_seed = None if seed is None else seed + batch_index
+            aggregator.add_counts(run_counts(backend, tqc, size, seed=batch_seed))
+            remaining -= size
+            batch_index += 1
+    return aggregator.result(top_k=top_k, bins=bins)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Jobs are long, disk- and memory-heavy runs, so only a few execute at once.
+JOB_WORKERS = int(os.environ.get("QSV_JOB_WORKERS", 1))
+# Finished jobs are kept in memory until this many newer ones have finished.
+JOB_HISTORY = int(os.environ.get("QSV_JOB_HISTORY", 100))
+
+
+class JobStore:
+    """In-process job registry backed by a small thread pool."""
+
+    def __init__(self, workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qsv-job")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._history = history
+
+    def submit(self, kind: str, fn: Callable[[], Dict[str, Any]]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "result": None,
+                "error": None,
+            }
+        self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable[[], Dict[str, Any]]) -> None:
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            result = fn()
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status="completed", result=result, finished_at=time.time())
+        self._prune()
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _prune(self) -> None:
+        with self._lock:
+            finished = [j for j, rec in self._jobs.items() if rec["status"] in {"completed", "failed"}]
+            for job_id in finished[:max(0, len(finished) - self._history)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+
+job_store = JobStore()
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .statevector import GateOp, iter_gate_ops
+
+
+MPS_MAX_BOND = int(os.environ.get("QSV_MPS_MAX_BOND", 64))
+MPS_TRUNCATION = float(os.environ.get("QSV_MPS_TRUNCATION", 1e-10))
+MPS_MAX_QUBITS = int(os.environ.get("QSV_MPS_MAX_QUBITS", 128))
+# Marginals cost 2**len(qubits) environments per site.
+MPS_MAX_MARGINAL_QUBITS = 16
+_SAMPLE_BATCH = 8192
+
+
+def _controlled_matrix(k: int, control_sites: Sequence[int], target_site: int, u: np.ndarray) -> np.ndarray:
+    """``2**k`` matrix applying ``u`` on ``target_site`` when every control site is 1.
+
+    Site ``j`` is bit ``k-1-j`` of the basis index, matching a C-ordered
+    reshape of ``k`` adjacent MPS sites.
+    """
+    m = np.eye(2 ** k, dtype=u.dtype)
+    ctrl_mask = sum(1 << (k - 1 - c) for c in control_sites)
+    tbit = 1 << (k - 1 - target_site)
+    for i in range(2 ** k):
+        if i & ctrl_mask == ctrl_mask and not i & tbit:
+            j = i | tbit
+            m[i, i], m[i, j] = u[0, 0], u[0, 1]
+            m[j, i], m[j, j] = u[1, 0], u[1, 1]
+    return m
+
+
+class MPSState:
+    """Matrix product state of ``num_qubits`` qubits on a line.
+
+    Site tensors have shape ``(left bond, 2, right bond)``. The state is kept
+    in mixed-canonical form around ``center``, so the singular values found
+    when splitting a gate are the true Schmidt coefficients and truncating
+    them is optimal. ``layout[q]`` is the site currently holding qubit ``q``;
+    two-qubit gates on distant qubits move one of them with SWAPs and the
+    layout follows, instead of swapping back after every gate.
+    """
+
+    def __init__(self, num_qubits: int, max_bond: int = MPS_MAX_BOND, threshold: float = MPS_TRUNCATION, dtype: Any = np.complex128):
+        self.num_qubits = num_qubits
+        self.max_bond = max_bond
+        self.threshold = threshold
+        self.dtype = np.dtype(dtype)
+        self.tensors: List[np.ndarray] = []
+        for _ in range(num_qubits):
+            site = np.zeros((1, 2, 1), dtype=self.dtype)
+            site[0, 0, 0] = 1
+            self.tensors.append(site)
+        self.center = 0
+        self.layout = list(range(num_qubits))
+        self.qubit_at = list(range(num_qubits))
+        self.truncation_error = 0.0
+        self.fidelity = 1.0
+        self.max_bond_reached = 1
+        self.num_swaps = 0
+
+    # -- canonical form -----------------------------------------------------
+
+    def _move_center(self, site: int) -> None:
+        while self.center < site:
+            a = self.tensors[self.center]
+            dl, d, dr = a.shape
+            q, r = np.linalg.qr(a.reshape(dl * d, dr))
+            self.tensors[self.center] = q.reshape(dl, d, -1)
+            self.tensors[self.center + 1] = np.einsum("ij,jsk->isk", r, self.tensors[self.center + 1])
+            self.center += 1
+        while self.center > site:
+            a = self.tensors[self.center]
+            dl, d, dr = a.shape
+            q, r = np.linalg.qr(a.reshape(dl, d * dr).T)
+            self.tensors[self.center] = q.T.reshape(-1, d, dr)
+            self.tensors[self.center - 1] = np.einsum("isj,kj->isk", self.tensors[self.center - 1], r)
+            self.center -= 1
+
+    def _truncate(self, s: np.ndarray) -> int:
+        """Number of singular values to keep; records the discarded weight."""
+        weights = s.astype(np.float64) ** 2
+        total = weights.sum()
+        keep = min(len(s), self.max_bond)
+        # Drop the smallest values while their combined weight stays under the threshold.
+        tail = np.cumsum(weights[::-1])[::-1] / total  # tail[i] = weight of values i..end
+        while keep > 1 and tail[keep - 1] <= self.threshold:
+            keep -= 1
+        discarded = float(weights[keep:].sum() / total)
+        self.truncation_error += discarded
+        self.fidelity *= 1.0 - discarded
+        return keep
+
+    # -- gate application ---------------------------------------------------
+
+    def _apply_sites(self, start: int, matrix: np.ndarray) -> None:
+        """Apply a ``2**k x 2**k`` matrix to sites ``start .. start+k-1`` and re-split them."""
+        k = int(np.log2(matrix.shape[0]))
+        if k == 1:
+            self.tensors[start] = np.einsum("st,itj->isj", matrix, self.tensors[start])
+            return
+        self._move_center(start)
+        theta = self.tensors[start]
+        for site in range(start + 1, start + k):
+            theta = np.tensordot(theta, self.tensors[site], axes=(-1, 0))
+        dl, dr = theta.shape[0], theta.shape[-1]
+        theta = theta.reshape(dl, 2 ** k, dr)
+        theta = np.einsum("st,itj->isj", matrix, theta)
+
+        for j in range(k - 1):
+            rows = theta.shape[0] * 2
+            mat = theta.reshape(rows, -1)
+            u, s, vh = np.linalg.svd(mat, full_matrices=False)
+            keep = self._truncate(s)
+            s = s[:keep] / np.linalg.norm(s[:keep])
+            self.max_bond_reached = max(self.max_bond_reached, keep)
+            self.tensors[start + j] = u[:, :keep].reshape(-1, 2, keep)
+            theta = (s[:, None] * vh[:keep]).astype(self.dtype)
+            theta = theta.reshape(keep, 2 ** (k - 1 - j), dr)
+        self.tensors[start + k - 1] = theta.reshape(-1, 2, dr)
+        self.center = start + k - 1
+
+    def _swap_sites(self, site: int) -> None:
+        """Exchange the qubits on ``site`` and ``site + 1``."""
+        swap = np.eye(4, dtype=self.dtype)[[0, 2, 1, 3]]
+        self._apply_sites(site, swap)
+        a, b = self.qubit_at[site], self.qubit_at[site + 1]
+        self.qubit_at[site], self.qubit_at[site + 1] = b, a
+        self.layout[a], self.layout[b] = site + 1, site
+        self.num_swaps += 1
+
+    def _gather(self, qubits: Sequence[int]) -> int:
+        """Swap ``qubits`` onto adjacent sites around the last one; return the lowest site."""
+        lo = hi = self.layout[qubits[-1]]
+        for q in sorted(qubits[:-1], key=lambda x: abs(self.layout[x] - lo)):
+            while self.layout[q] > hi + 1:
+                self._swap_sites(self.layout[q] - 1)
+            while self.layout[q] < lo - 1:
+                self._swap_sites(self.layout[q])
+            lo, hi = min(lo, self.layout[q]), max(hi, self.layout[q])
+        return lo
+
+    def apply(self, op: GateOp, rng: np.random.Generator) -> None:
+        if op.kind == "swap":
+            # A logical SWAP is a relabelling of sites.
+            a, b = op.targets
+            sa, sb = self.layout[a], self.layout[b]
+            self.layout[a], self.layout[b] = sb, sa
+            self.qubit_at[sa], self.qubit_at[sb] = b, a
+            return
+        if op.kind == "reset":
+            site = self.layout[op.targets[0]]
+            self._move_center(site)
+            a = self.tensors[site]
+            p1 = float(np.vdot(a[:, 1, :], a[:, 1, :]).real)
+            p0 = float(np.vdot(a[:, 0, :], a[:, 0, :]).real)
+            if rng.random() * (p0 + p1) < p1:
+                m = np.array([[0, 1 / np.sqrt(p1)], [0, 0]], dtype=self.dtype)
+            else:
+                m = np.array([[1 / np.sqrt(p0), 0], [0, 0]], dtype=self.dtype)
+            self._apply_sites(site, m)
+            return
+
+        u = op.matrix.astype(self.dtype)
+        if not op.controls:
+            self._apply_sites(self.layout[op.targets[0]], u)
+            return
+        qubits = [*op.controls, op.targets[0]]
+        start = self._gather(qubits)
+        k = len(qubits)
+        local = {self.qubit_at[start + j]: j for j in range(k)}
+        matrix = _controlled_matrix(k, [local[c] for c in op.controls], local[op.targets[0]], u)
+        self._apply_sites(start, matrix)
+
+    def restore_order(self) -> None:
+        """Bubble qubits back to site ``q`` for qubit ``q``."""
+        for target in range(self.num_qubits):
+            while self.layout[target] > target:
+                self._swap_sites(self.layout[target] - 1)
+
+    # -- measurements (qubit q on site q; call restore_order first) -----------
+
+    def bond_dimensions(self) -> List[int]:
+        return [t.shape[2] for t in self.tensors[:-1]]
+
+    def bloch_vectors(self) -> List[Dict[str, Any]]:
+        vectors: List[Dict[str, Any]] = []
+        for site in range(self.num_qubits):
+            self._move_center(site)
+            a = self.tensors[site]
+            rho_10 = np.vdot(a[:, 0, :], a[:, 1, :])
+            z = np.vdot(a[:, 0, :], a[:, 0, :]).real - np.vdot(a[:, 1, :], a[:, 1, :]).real
+            q = self.qubit_at[site]
+            vectors.append({
+                'x': float(2 * rho_10.real),
+                'y': float(2 * rho_10.imag),
+                'z': float(z),
+                'qubit': q,
+                'label': f'q{q}',
+            })
+        vectors.sort(key=lambda v: v['qubit'])
+        return vectors
+
+    def cut_entropies(self) -> Dict[str, float]:
+        """Entropy across every bond; ``cut_i`` separates sites ``0..i-1`` from the rest."""
+        entropies: Dict[str, float] = {}
+        for site in range(self.num_qubits - 1):
+            self._move_center(site)
+            a = self.tensors[site]
+            s = np.linalg.svd(a.reshape(-1, a.shape[2]), compute_uv=False).astype(np.float64)
+            p = s ** 2
+            p = p[p > 1e-12]
+            entropies[f'cut_{site + 1}'] = float(-np.sum(p * np.log2(p)))
+        return entropies
+
+    def marginal(self, qubits: Sequence[int]) -> List[float]:
+        """Probabilities over ``qubits``; bit ``j`` of the index is ``qubits[j]``."""
+        if len(qubits) > MPS_MAX_MARGINAL_QUBITS:
+            raise ValueError(f"MPS marginals are limited to {MPS_MAX_MARGINAL_QUBITS} qubits")
+        wanted = {self.layout[q]: q for q in qubits}
+        env = np.ones((1, 1), dtype=self.dtype)      # shape (*outcomes, bond, bond)
+        order: List[int] = []                       # qubit for each outcome axis
+        for site, a in enumerate(self.tensors):
+            if site in wanted:
+                # One environment per value of this qubit.
+                env = np.stack([
+                    np.einsum("...ab,asc,bsd->...cd", env, a[:, s:s + 1, :], a[:, s:s + 1, :].conj())
+                    for s in (0, 1)
+                ], axis=-3)
+                order.append(wanted[site])
+            else:
+                env = np.einsum("...ab,asc,bsd->...cd", env, a, a.conj())
+        probs = np.real(env[..., 0, 0])
+        # Reorder axes so the C-ordered flat index has qubits[j] at bit j.
+        axes = [order.index(q) for q in reversed(list(qubits))]
+        return np.transpose(probs, axes).reshape(-1).astype(np.float64).tolist()
+
+    def sample_counts(self, shots: int, rng: np.random.Generator) -> Dict[str, int]:
+        """Sample full bitstrings site by site from the right-canonical form."""
+        self._move_center(0)
+        counts: Dict[str, int] = {}
+        n = self.num_qubits
+        remaining = shots
+        while remaining > 0:
+            batch = min(remaining, _SAMPLE_BATCH)
+            remaining -= batch
+            left = np.ones((batch, 1), dtype=self.dtype)
+            bits = np.zeros((batch, n), dtype=np.uint8)
+            for site, a in enumerate(self.tensors):
+                v0 = left @ a[:, 0, :]
+                v1 = left @ a[:, 1, :]
+                p0 = np.sum(np.abs(v0) ** 2, axis=1)
+                p1 = np.sum(np.abs(v1) ** 2, axis=1)
+                one = rng.random(batch) * (p0 + p1) < p1
+                bits[:, self.qubit_at[site]] = one
+                chosen = np.where(one[:, None], v1, v0)
+                norm = np.sqrt(np.where(one, p1, p0))
+                left = chosen / np.maximum(norm, 1e-30)[:, None]
+            rows, freq = np.unique(bits[:, ::-1], axis=0, return_counts=True)
+            for row, c in zip(rows, freq):
+                key = "".join("1" if b else "0" for b in row)
+                counts[key] = counts.get(key, 0) + int(c)
+        return counts
+
+
+def run_mps(
+    num_qubits: int,
+    gates: List[Dict[str, Any]],
+    dtype: Any = np.complex128,
+    max_bond: int | None = None,
+    threshold: float | None = None,
+    seed: int | None = None,
+) -> MPSState:
+    """Evolve |0...0> as an MPS; qubits are back on their own sites on return."""
+    if num_qubits > MPS_MAX_QUBITS:
+        raise ValueError(f"MPS simulation is limited to {MPS_MAX_QUBITS} qubits")
+    state = MPSState(
+        num_qubits,
+        max_bond=max_bond or MPS_MAX_BOND,
+        threshold=MPS_TRUNCATION if threshold is None else threshold,
+        dtype=dtype,
+    )
+    rng = np.random.default_rng(seed)
+    for op in iter_gate_ops(gates):
+        state.apply(op, rng)
+    state.restore_order()
+    return state
+
+
+def summarize_mps(
+    state: MPSState,
+    shots: int = 0,
+    marginal_qubits: List[int] | None = None,
+    bloch: bool = True,
+    seed: int | None = None,
+) -> Dict[str, Any]:
+    """The results a job or analysis request can read directly from the MPS."""
+    result: Dict[str, Any] = {
+        "entanglement_entropies": state.cut_entropies(),
+    }
+    if bloch:
+        result["bloch_vectors"] = state.bloch_vectors()
+    if marginal_qubits:
+        if any(q < 0 or q >= state.num_qubits for q in marginal_qubits):
+            raise ValueError("marginal_qubits must be qubit indices of the circuit")
+        result["marginal"] = {"qubits": list(marginal_qubits), "probabilities": state.marginal(marginal_qubits)}
+    if shots > 0:
+        result["measurement_counts"] = state.sample_counts(shots, np.random.default_rng(seed))
+    result["mps"] = mps_info(state)
+    return result
+
+
+def compute_mps_analytics(state: MPSState) -> Dict[str, Any]:
+    """The ``/api/analysis`` analytics block, read from an MPS instead of a statevector."""
+    bloch_vectors = state.bloch_vectors()
+    return {
+        "fidelity": None,
+        "expectation_values": {
+            'X': [bv['x'] for bv in bloch_vectors],
+            'Y': [bv['y'] for bv in bloch_vectors],
+            'Z': [bv['z'] for bv in bloch_vectors],
+        },
+        "entanglement_entropy": None,
+        "bloch_vectors": bloch_vectors,
+        "entanglement_entropies": state.cut_entropies(),
+        # Needs every amplitude; not available from an MPS.
+        "participation_ratio": None,
+        "mps": mps_info(state),
+    }
+
+
+def mps_info(state: MPSState) -> Dict[str, Any]:
+    return {
+        "max_bond_dimension": state.max_bond,
+        "bond_dimensions": state.bond_dimensions(),
+        "max_bond_reached": state.max_bond_reached,
+        "truncation_threshold": state.threshold,
+        "truncation_error": state.truncation_error,
+        "estimated_fidelity": state.fidelity,
+        "swaps": state.num_swaps,
+    }
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .statevector import GateOp, SIM_THREADS, PARALLEL_MIN_QUBITS, apply_gate_op_parallel, iter_gate_ops
+
+
+OOC_DIR = os.environ.get("QSV_OOC_DIR") or tempfile.gettempdir()
+OOC_MEMORY_MB = int(os.environ.get("QSV_OOC_MEMORY_MB", 1024))
+OOC_MAX_QUBITS = int(os.environ.get("QSV_OOC_MAX_QUBITS", 32))
+
+# A pass may touch this many qubits outside the block, i.e. load 2**3 blocks
+# at once, which is enough for every gate the simulator supports (CCX).
+_MAX_OUTER_QUBITS = 3
+# Working memory per loaded amplitude: the loaded copy plus the kernel's
+# temporaries (a copy of half the group and one product).
+_WORK_FACTOR = 4
+
+
+def plan_layout(num_qubits: int, ops: List[GateOp]) -> List[int]:
+    """Map logical qubits to storage bit positions, most-used qubits lowest.
+
+    Low bits fall inside a block, so gates on the busiest qubits never need
+    amplitudes from another block.
+    """
+    usage = [0] * num_qubits
+    for op in ops:
+        for q in set(op.targets) | set(op.controls):
+            usage[q] += 1
+    order = sorted(range(num_qubits), key=lambda q: (-usage[q], q))
+    layout = [0] * num_qubits
+    for physical, logical in enumerate(order):
+        layout[logical] = physical
+    return layout
+
+
+def block_qubits(num_qubits: int, itemsize: int, memory_cap_mb: int) -> int:
+    """Largest block (in qubits) whose biggest pass fits in ``memory_cap_mb``."""
+    budget = memory_cap_mb * 2 ** 20 // (itemsize * _WORK_FACTOR * 2 ** _MAX_OUTER_QUBITS)
+    if budget < 2:
+        raise ValueError(f"Memory cap of {memory_cap_mb} MB is too small for out-of-core simulation")
+    return min(num_qubits, int(budget).bit_length() - 1)
+
+
+class OutOfCoreState:
+    """A statevector stored in a ``numpy.memmap`` file and processed block by block.
+
+    Storage bit ``p`` of an amplitude index holds logical qubit ``layout.index(p)``;
+    a block is ``2**block`` consecutive amplitudes, i.e. fixed values of the
+    storage bits at or above ``block``.
+    """
+
+    def __init__(self, num_qubits: int, layout: List[int], dtype: Any, memory_cap_mb: int, directory: str | None = None):
+        self.num_qubits = num_qubits
+        self.layout = layout
+        self.dtype = np.dtype(dtype)
+        self.block = block_qubits(num_qubits, self.dtype.itemsize, memory_cap_mb)
+        self.num_blocks = 2 ** (num_qubits - self.block)
+        self.block_size = 2 ** self.block
+
+        directory = directory or OOC_DIR
+        nbytes = 2 ** num_qubits * self.dtype.itemsize
+        free = shutil.disk_usage(directory).free
+        if nbytes > free:
+            raise ValueError(f"Statevector needs {nbytes / 2**30:.1f} GiB but {directory} has {free / 2**30:.1f} GiB free")
+        fd, self.path = tempfile.mkstemp(prefix="qsv-sv-", suffix=".bin", dir=directory)
+        os.close(fd)
+        self.data = np.memmap(self.path, dtype=self.dtype, mode="w+", shape=(2 ** num_qubits,))
+        self.data[0] = 1
+
+    def close(self) -> None:
+        data, self.data = self.data, None
+        del data
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    # -- block access -------------------------------------------------------
+
+    def _blocks(self, block_id: int) -> slice:
+        start = block_id * self.block_size
+        return slice(start, start + self.block_size)
+
+    def iter_blocks(self) -> Iterator[Tuple[int, np.ndarray]]:
+        for block_id in range(self.num_blocks):
+            yield block_id, self.data[self._blocks(block_id)]
+
+    def _groups(self, outer: List[int]) -> Iterator[List[int]]:
+        """Block ids loaded together when ``outer`` storage bits (all >= block) are in play.
+
+        Within a group, the ``j``-th outer bit is bit ``j`` of the position.
+        """
+        shifts = [p - self.block for p in outer]
+        rest = [s for s in range(self.num_qubits - self.block) if s not in shifts]
+        for rest_bits in itertools.product((0, 1), repeat=len(rest)):
+            base = sum(bit << s for bit, s in zip(rest_bits, rest))
+            yield [
+                base + sum(((c >> j) & 1) << s for j, s in enumerate(shifts))
+                for c in range(2 ** len(shifts))
+            ]
+
+    # -- evolution ----------------------------------------------------------
+
+    def _run_pass(self, ops: List[GateOp]) -> None:
+        """Load each group of blocks once, apply all ``ops`` to it and write it back."""
+        touched = sorted({p for op in ops for p in (*op.targets, *op.controls) if p >= self.block})
+        local = {p: self.block + j for j, p in enumerate(touched)}
+        local_qubits = self.block + len(touched)
+        local_ops = [
+            op._replace(
+                targets=tuple(local.get(p, p) for p in op.targets),
+                controls=tuple(local.get(p, p) for p in op.controls),
+            )
+            for op in ops
+        ]
+        threads = SIM_THREADS if local_qubits >= PARALLEL_MIN_QUBITS else 1
+        for group in self._groups(touched):
+            buf = np.concatenate([self.data[self._blocks(b)] for b in group])
+            tensor = buf.reshape((2,) * local_qubits)
+            for op in local_ops:
+                apply_gate_op_parallel(tensor, op, local_qubits, threads)
+            for i, b in enumerate(group):
+                self.data[self._blocks(b)] = buf[i * self.block_size:(i + 1) * self.block_size]
+
+    def _probability_one(self, p: int) -> Tuple[float, float]:
+        p0 = p1 = 0.0
+        for block_id, amps in self.iter_blocks():
+            probs = np.abs(amps) ** 2
+            if p >= self.block:
+                weight = float(probs.sum())
+                if (block_id >> (p - self.block)) & 1:
+                    p1 += weight
+                else:
+                    p0 += weight
+            else:
+                view = probs.reshape(-1, 2, 2 ** p)
+                p0 += float(view[:, 0, :].sum())
+                p1 += float(view[:, 1, :].sum())
+        return p0, p1
+
+    def evolve(self, ops: List[GateOp], rng: np.random.Generator) -> None:
+        """Apply ``ops`` (in logical qubits) with as few passes over the file as possible.
+
+        Consecutive operations are fused into one pass while together they
+        touch at most ``_MAX_OUTER_QUBITS`` storage bits outside the block.
+        """
+        pending: List[GateOp] = []
+        outer: set[int] = set()
+        for op in ops:
+            op = op._replace(
+                targets=tuple(self.layout[q] for q in op.targets),
+                controls=tuple(self.layout[q] for q in op.controls),
+            )
+            if op.kind == "reset":
+                # Reset needs the qubit's probability over the whole state;
+                # collapse it with a (non-unitary) 2x2 matrix in the next pass.
+                if pending:
+                    self._run_pass(pending)
+                    pending, outer = [], set()
+                p = op.targets[0]
+                p0, p1 = self._probability_one(p)
+                if rng.random() * (p0 + p1) < p1:
+                    m = np.array([[0, 1 / np.sqrt(p1)], [0, 0]], dtype=self.dtype)
+                else:
+                    m = np.array([[1 / np.sqrt(p0), 0], [0, 0]], dtype=self.dtype)
+                op = GateOp("unitary", (p,), (), m)
+            elif op.matrix is not None:
+                op = op._replace(matrix=op.matrix.astype(self.dtype))
+            op_outer = {p for p in (*op.targets, *op.controls) if p >= self.block}
+            if len(outer | op_outer) > _MAX_OUTER_QUBITS:
+                self._run_pass(pending)
+                pending, outer = [], set()
+            pending.append(op)
+            outer |= op_outer
+        if pending:
+            self._run_pass(pending)
+
+    # -- streaming results --------------------------------------------------
+
+    def to_logical(self, indices: np.ndarray) -> np.ndarray:
+        indices = indices.astype(np.uint64)
+        out = np.zeros_like(indices)
+        for q, p in enumerate(self.layout):
+            out |= ((indices >> np.uint64(p)) & np.uint64(1)) << np.uint64(q)
+        return out
+
+    def bitstring(self, logical_index: int) -> str:
+        return format(int(logical_index), f"0{self.num_qubits}b")
+
+    def summarize(self, top_k: int, marginal_qubits: List[int] | None, want_bloch: bool) -> Dict[str, Any]:
+        """One read pass for block weights, top-k amplitudes, a marginal and in-block Bloch terms."""
+        n, b = self.num_qubits, self.block
+        block_weights = np.zeros(self.num_blocks)
+        top: List[Tuple[float, int, complex]] = []
+        marginal_bits = [self.layout[q] for q in marginal_qubits or []]
+        marginal = np.zeros(2 ** len(marginal_bits)) if marginal_qubits else None
+        rho_10 = np.zeros(n, dtype=np.complex128)
+        z = np.zeros(n)
+        local = np.arange(self.block_size, dtype=np.uint64)
+
+        for block_id, amps in self.iter_blocks():
+            probs = np.abs(amps) ** 2
+            weight = float(probs.sum())
+            block_weights[block_id] = weight
+            if weight == 0:
+                continue
+            base = np.uint64(block_id << b)
+
+            if top_k > 0:
+                k = min(top_k, probs.size)
+                for i in np.argpartition(probs, probs.size - k)[-k:]:
+                    if probs[i] == 0:
+                        continue
+                    item = (float(probs[i]), int(base + np.uint64(i)), complex(amps[i]))
+                    if len(top) < top_k:
+                        heapq.heappush(top, item)
+                    elif item[0] > top[0][0]:
+                        heapq.heapreplace(top, item)
+
+            if marginal is not None:
+                idx = base + local
+                key = np.zeros(self.block_size, dtype=np.int64)
+                for j, p in enumerate(marginal_bits):
+                    key |= (((idx >> np.uint64(p)) & np.uint64(1)) << np.uint64(j)).astype(np.int64)
+                marginal += np.bincount(key, weights=probs, minlength=marginal.size)
+
+            if want_bloch:
+                for p in range(n):
+                    if p < b:
+                        view = amps.reshape(-1, 2, 2 ** p)
+                        a0, a1 = view[:, 0, :], view[:, 1, :]
+                        rho_10[p] += np.vdot(a0, a1)
+                        z[p] += float(np.vdot(a0, a0).real - np.vdot(a1, a1).real)
+                    else:
+                        z[p] += -weight if (block_id >> (p - b)) & 1 else weight
+
+        result: Dict[str, Any] = {"block_weights": block_weights}
+        top.sort(reverse=True)
+        logical = self.to_logical(np.array([idx for _, idx, _ in top], dtype=np.uint64))
+        result["top_amplitudes"] = [
+            {
+                "index": int(index),
+                "bitstring": self.bitstring(index),
+                "amplitude": [amp.real, amp.imag],
+                "probability": prob,
+            }
+            for (prob, _, amp), index in zip(top, logical)
+        ]
+        if marginal is not None:
+            result["marginal"] = {"qubits": list(marginal_qubits), "probabilities": marginal.tolist()}
+        if want_bloch:
+            # Qubits stored above the block need overlaps between block pairs.
+            for p in range(b, n):
+                shift = p - b
+                for block_id in range(self.num_blocks):
+                    if (block_id >> shift) & 1:
+                        continue
+                    partner = block_id | (1 << shift)
+                    if block_weights[block_id] == 0 and block_weights[partner] == 0:
+                        continue
+                    rho_10[p] += np.vdot(self.data[self._blocks(block_id)], self.data[self._blocks(partner)])
+            result["bloch_vectors"] = [
+                {
+                    "x": float(2 * rho_10[self.layout[q]].real),
+                    "y": float(2 * rho_10[self.layout[q]].imag),
+                    "z": float(z[self.layout[q]]),
+                    "qubit": q,
+                    "label": f"q{q}",
+                }
+                for q in range(n)
+            ]
+        return result
+
+    def sample_counts(self, shots: int, block_weights: np.ndarray, rng: np.random.Generator) -> Dict[str, int]:
+        """Sample in two stages: shots per block, then outcomes within each hit block."""
+        per_block = rng.multinomial(shots, block_weights / block_weights.sum())
+        counts: Dict[str, int] = {}
+        for block_id in np.flatnonzero(per_block):
+            probs = np.abs(self.data[self._blocks(block_id)]).astype(np.float64) ** 2
+            hits = rng.multinomial(per_block[block_id], probs / probs.sum())
+            local = np.flatnonzero(hits)
+            logical = self.to_logical(np.uint64(block_id << self.block) + local.astype(np.uint64))
+            for idx, c in zip(logical, hits[local]):
+                counts[self.bitstring(idx)] = int(c)
+        return counts
+
+
+def run_out_of_core(
+    num_qubits: int,
+    gates: List[Dict[str, Any]],
+    dtype: Any = np.complex64,
+    memory_cap_mb: int | None = None,
+    top_k: int = 16,
+    marginal_qubits: List[int] | None = None,
+    shots: int = 0,
+    bloch: bool = True,
+    seed: int | None = None,
+) -> Dict[str, Any]:
+    """Simulate with the statevector on disk and return streamed summaries."""
+    if num_qubits > OOC_MAX_QUBITS:
+        raise ValueError(f"Out-of-core simulation is limited to {OOC_MAX_QUBITS} qubits")
+    if marginal_qubits and any(q < 0 or q >= num_qubits for q in marginal_qubits):
+        raise ValueError("marginal_qubits must be qubit indices of the circuit")
+    ops = list(iter_gate_ops(gates))
+    rng = np.random.default_rng(seed)
+    state = OutOfCoreState(num_qubits, plan_layout(num_qubits, ops), dtype, memory_cap_mb or OOC_MEMORY_MB)
+    try:
+        state.evolve(ops, rng)
+        summary = state.summarize(top_k, marginal_qubits, bloch)
+        block_weights = summary.pop("block_weights")
+        if shots > 0:
+            summary["measurement_counts"] = state.sample_counts(shots, block_weights, rng)
+        summary["layout"] = {
+            "block_qubits": state.block,
+            "num_blocks": state.num_blocks,
+            "qubit_order": state.layout,
+        }
+        return summary
+    finally:
+        state.close()
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import ast
+import functools
+import math
+import operator
+import os
+import re
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+
+class QasmError(ValueError):
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+# QASM gate -> (payload name, number of qubit arguments, number of parameters).
+# For controlled gates the leading arguments are the controls.
+_GATES: Dict[str, Tuple[str, int, int]] = {
+    "x": ("X", 1, 0), "y": ("Y", 1, 0), "z": ("Z", 1, 0),
+    "h": ("H", 1, 0), "s": ("S", 1, 0), "t": ("T", 1, 0),
+    "rx": ("RX", 1, 1), "ry": ("RY", 1, 1), "rz": ("RZ", 1, 1),
+    "p": ("P", 1, 1), "u1": ("U1", 1, 1), "u2": ("U2", 1, 2),
+    "u3": ("U3", 1, 3), "u": ("U", 1, 3), "U": ("U", 1, 3),
+    "cx": ("CX", 2, 0), "CX": ("CX", 2, 0), "cz": ("CZ", 2, 0),
+    "crx": ("CRX", 2, 1), "cry": ("CRY", 2, 1), "crz": ("CRZ", 2, 1),
+    "swap": ("SWAP", 2, 0), "ccx": ("CCX", 3, 0),
+}
+_NUM_CONTROLS = {"CX": 1, "CZ": 1, "CRX": 1, "CRY": 1, "CRZ": 1, "CCX": 2}
+
+_BINOPS: Dict[type, Callable[[float, float], float]] = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Pow: operator.pow,
+}
+_FUNCS: Dict[str, Callable[[float], float]] = {
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "exp": math.exp,
+    "ln": math.log, "sqrt": math.sqrt,
+}
+
+# Largest total qubit count a file may declare; register arguments expand to one gate per qubit.
+QASM_MAX_QUBITS = int(os.environ.get("QSV_QASM_MAX_QUBITS", 128))
+
+# What ends a run of plain statement text, and of a skipped gate body.
+_SCAN = re.compile(r"[;\n]|//")
+_SCAN_BODY = re.compile(r"[}\n]|//")
+_STATEMENT = re.compile(r"^([A-Za-z_][\w]*)\s*(?:\((.*)\))?\s*(.*)$", re.S)
+_ARG = re.compile(r"^([A-Za-z_]\w*)\s*(?:\[\s*(\d+)\s*\])?$")
+_REG = re.compile(r"^([A-Za-z_]\w*)\s*\[\s*(\d+)\s*\]$")
+
+
+@functools.lru_cache(maxsize=4096)
+def _eval_expr(expr: str) -> float:
+    """Value of a parameter expression; raises ``ValueError`` with a message."""
+    try:
+        return float(expr)
+    except ValueError:
+        pass
+
+    def ev(node: ast.AST) -> float:
+        if isinstance(node, ast.Expression):
+            return ev(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return float(node.value)
+        if isinstance(node, ast.Name) and node.id == "pi":
+            return math.pi
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = ev(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            return _BINOPS[type(node.op)](ev(node.left), ev(node.right))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCS and len(node.args) == 1:
+            return _FUNCS[node.func.id](ev(node.args[0]))
+        raise ValueError(f"unsupported parameter expression '{expr}'")
+
+    try:
+        tree = ast.parse(expr.replace("^", "**"), mode="eval")
+    except SyntaxError:
+        raise ValueError(f"invalid parameter expression '{expr}'")
+    try:
+        return ev(tree)
+    except (ZeroDivisionError, OverflowError) as e:
+        raise ValueError(f"cannot evaluate '{expr}': {e}")
+
+
+def _eval_param(expr: str, line: int) -> float:
+    try:
+        return _eval_expr(expr.strip())
+    except ValueError as e:
+        raise QasmError(line, str(e))
+
+
+class QasmParser:
+    """Incremental OpenQASM 2 parser producing ``CircuitPayload`` gate dicts.
+
+    Text is fed in arbitrary chunks; complete statements are parsed as soon as
+    their ``;`` arrives, so memory is bounded by the gate list, not the source.
+    Problems are collected as ``QasmError`` with the statement's line number.
+    """
+
+    def __init__(self, max_errors: int = 50):
+        self.qregs: Dict[str, Tuple[int, int]] = {}  # name -> (offset, size)
+        self.cregs: Dict[str, int] = {}
+        self.num_qubits = 0
+        self.gates: List[Dict[str, Any]] = []
+        self.errors: List[QasmError] = []
+        self.max_errors = max_errors
+        self._line = 1            # line of the next character to be scanned
+        self._pieces: List[str] = []  # text of the unterminated statement
+        self._statement_line = 1
+        self._carry = ""          # a trailing '/' that may start a comment in the next chunk
+        self._in_comment = False
+        self._saw_header = False
+        self._in_body = False     # inside the { ... } of a rejected gate definition
+        self._resolved: Dict[str, List[int]] = {}
+
+    # -- input --------------------------------------------------------------
+
+    def feed(self, text: str) -> None:
+        """Scan ``text`` once, parsing each statement as its ``;`` is found.
+
+        Only the unterminated tail of the last statement is kept between
+        chunks, so a file without newlines is parsed in linear time.
+        """
+        text = self._carry + text
+        self._carry = ""
+        # An odd run of trailing slashes leaves one that may pair with the next chunk.
+        if (len(text) - len(text.rstrip("/"))) % 2:
+            self._carry, text = "/", text[:-1]
+        pos, end = 0, len(text)
+        while pos < end:
+            if self._in_comment:
+                newline = text.find("\n", pos)
+                if newline < 0:
+                    return
+                self._in_comment = False
+                pos = newline
+                continue
+            match = (_SCAN_BODY if self._in_body else _SCAN).search(text, pos)
+            stop = match.start() if match else end
+            if not self._in_body and stop > pos:
+                piece = text[pos:stop]
+                if not self._pieces and piece.strip():
+                    self._statement_line = self._line
+                if self._pieces or piece.strip():
+                    self._pieces.append(piece)
+            if match is None:
+                return
+            token, pos = match.group(), match.end()
+            if token == "\n":
+                self._line += 1
+                if self._pieces:
+                    self._pieces.append(" ")
+            elif token == "//":
+                self._in_comment = True
+            elif token == "}":
+                self._in_body = False
+            else:
+                self._end_statement()
+
+    def close(self) -> Dict[str, Any]:
+        if self._carry and not self._in_body:
+            self._pieces.append(self._carry)
+        self._carry = ""
+        if "".join(self._pieces).strip():
+            self._error(self._statement_line, "statement is missing ';'")
+        if not self.qregs:
+            self._error(self._line, "no qreg declared")
+        return {"qubits": self.num_qubits, "gates": self.gates}
+
+    def _end_statement(self) -> None:
+        statement = "".join(self._pieces).strip()
+        self._pieces = []
+        if statement and len(self.errors) < self.max_errors:
+            try:
+                self._parse(statement, self._statement_line)
+            except QasmError as e:
+                self.errors.append(e)
+
+    def _error(self, line: int, message: str) -> None:
+        if len(self.errors) < self.max_errors:
+            self.errors.append(QasmError(line, message))
+
+    # -- statements ---------------------------------------------------------
+
+    def _parse(self, statement: str, line: int) -> None:
+        # Gates are the bulk of any large file; recognise them first.
+        match = _STATEMENT.match(statement)
+        if match and match.group(1) in _GATES:
+            self._parse_gate(*match.groups(), line)
+            return
+        if not self._saw_header:
+            self._saw_header = True
+            if statement.startswith("OPENQASM"):
+                if statement.split()[1:] != ["2.0"]:
+                    raise QasmError(line, f"only OpenQASM 2.0 is supported, got '{statement}'")
+                return
+        if statement.startswith("include"):
+            return
+        if statement.startswith(("gate ", "gate\t", "opaque ")):
+            if "{" in statement and "}" not in statement:
+                self._in_body = True
+            raise QasmError(line, "custom gate definitions are not supported")
+        if statement.startswith("if"):
+            raise QasmError(line, "classically controlled operations are not supported")
+
+        if not match:
+            raise QasmError(line, f"cannot parse '{statement}'")
+        keyword, params_text, rest = match.groups()
+
+        if keyword in ("qreg", "creg"):
+            reg = _REG.match(rest.strip())
+            if not reg:
+                raise QasmError(line, f"malformed {keyword} declaration '{statement}'")
+            name, size = reg.group(1), int(reg.group(2))
+            if name in self.qregs or name in self.cregs:
+                raise QasmError(line, f"register '{name}' is already declared")
+            if keyword == "qreg":
+                if self.num_qubits + size > QASM_MAX_QUBITS:
+                    raise QasmError(line, f"more than {QASM_MAX_QUBITS} qubits declared")
+                self.qregs[name] = (self.num_qubits, size)
+                self.num_qubits += size
+            else:
+                self.cregs[name] = size
+            return
+
+        if keyword == "measure":
+            source = rest.split("->", 1)[0]
+            for qubits in self._broadcast([source], line):
+                self._append({"name": "MEASURE", "targets": qubits})
+            return
+        if keyword == "reset":
+            for qubits in self._broadcast([rest], line):
+                self._append({"name": "RESET", "targets": qubits})
+            return
+        if keyword == "barrier":
+            self._append({"name": "BARRIER", "targets": list(range(self.num_qubits))})
+            return
+        if keyword == "id":
+            self._broadcast([rest], line)
+            return
+
+        raise QasmError(line, f"unsupported gate '{keyword}'")
+
+    def _parse_gate(self, keyword: str, params_text: str | None, rest: str, line: int) -> None:
+        self._saw_header = True
+        name, num_args, num_params = _GATES[keyword]
+        params = [_eval_param(p, line) for p in params_text.split(",")] if params_text and params_text.strip() else []
+        if len(params) != num_params:
+            raise QasmError(line, f"'{keyword}' takes {num_params} parameter(s), got {len(params)}")
+        args = rest.split(",")
+        if len(args) != num_args:
+            raise QasmError(line, f"'{keyword}' takes {num_args} qubit argument(s), got {len(args)}")
+        num_controls = _NUM_CONTROLS.get(name, 0)
+        for qubits in self._broadcast(args, line):
+            if len(set(qubits)) != len(qubits):
+                raise QasmError(line, f"'{keyword}' uses the same qubit twice")
+            gate: Dict[str, Any] = {"name": name, "targets": qubits[num_controls:]}
+            if num_controls:
+                gate["controls"] = qubits[:num_controls]
+            if params:
+                gate["params"] = params
+            self._append(gate)
+
+    def _resolve(self, arg: str, line: int) -> List[int]:
+        # Registers are never redeclared, so a resolved argument stays valid.
+        cached = self._resolved.get(arg)
+        if cached is not None:
+            return cached
+        match = _ARG.match(arg.strip())
+        if not match or match.group(1) not in self.qregs:
+            raise QasmError(line, f"unknown qubit argument '{arg.strip()}'")
+        offset, size = self.qregs[match.group(1)]
+        if match.group(2) is None:
+            qubits = list(range(offset, offset + size))
+        else:
+            index = int(match.group(2))
+            if index >= size:
+                raise QasmError(line, f"index {index} out of range for '{match.group(1)}[{size}]'")
+            qubits = [offset + index]
+        self._resolved[arg] = qubits
+        return qubits
+
+    def _broadcast(self, args: List[str], line: int) -> Iterator[List[int]]:
+        """Expand whole-register arguments into one qubit tuple per position."""
+        resolved = [self._resolve(a, line) for a in args]
+        if all(len(r) == 1 for r in resolved):
+            return iter(([r[0] for r in resolved],))
+        sizes = {len(r) for r in resolved if len(r) > 1}
+        if len(sizes) > 1:
+            raise QasmError(line, "register arguments have different sizes")
+        width = sizes.pop() if sizes else 1
+        return ([r[i] if len(r) > 1 else r[0] for r in resolved] for i in range(width))
+
+    def _append(self, gate: Dict[str, Any]) -> None:
+        gate["step"] = len(self.gates)
+        self.gates.append(gate)
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value))
+
+
+def iter_qasm(num_qubits: int, gates: List[Dict[str, Any]]) -> Iterator[str]:
+    """OpenQASM 2 for a gate payload, line by line, without building a Qiskit circuit.
+
+    Follows ``build_qiskit_circuit``: gates in ``step`` order, one instruction
+    per target (and per control for two-qubit controlled gates), unknown gates
+    skipped.
+    """
+    yield "OPENQASM 2.0;\n"
+    yield 'include "qelib1.inc";\n'
+    yield f"qreg q[{num_qubits}];\n"
+    yield f"creg c[{num_qubits}];\n"
+    for g in sorted(gates, key=lambda g: g.get('step', 0)):
+        name = g.get('name')
+        targets: List[int] = g.get('targets', [])
+        controls: List[int] = g.get('controls', [])
+        params: List[float] = g.get('params', [])
+        if name is None or not targets:
+            continue
+        name = name.upper()
+        theta = _fmt(params[0] if params else 0.0)
+
+        if name in {"X", "Y", "Z", "H", "S", "T"}:
+            for t in targets:
+                yield f"{name.lower()} q[{t}];\n"
+        elif name in {"RX", "RY", "RZ"}:
+            for t in targets:
+                yield f"{name.lower()}({theta}) q[{t}];\n"
+        elif name in {"U", "U3"}:
+            th, ph, lm = (params + [0.0, 0.0, 0.0])[:3]
+            for t in targets:
+                yield f"u({_fmt(th)},{_fmt(ph)},{_fmt(lm)}) q[{t}];\n"
+        elif name in {"P", "PHASE", "U1"}:
+            for t in targets:
+                yield f"p({theta}) q[{t}];\n"
+        elif name == "U2":
+            phi = _fmt(params[0] if len(params) > 0 else 0.0)
+            lam = _fmt(params[1] if len(params) > 1 else 0.0)
+            for t in targets:
+                yield f"u(pi/2,{phi},{lam}) q[{t}];\n"
+        elif name in {"CX", "CNOT", "CZ"}:
+            op = "cz" if name == "CZ" else "cx"
+            for ctrl in controls:
+                for t in targets:
+                    yield f"{op} q[{ctrl}],q[{t}];\n"
+        elif name in {"CRX", "CRY", "CRZ"}:
+            for ctrl in controls:
+                for t in targets:
+                    yield f"{name.lower()}({theta}) q[{ctrl}],q[{t}];\n"
+        elif name == "SWAP":
+            if len(targets) >= 2:
+                yield f"swap q[{targets[0]}],q[{targets[1]}];\n"
+        elif name in {"CCX", "TOFFOLI"}:
+            if len(controls) >= 2:
+                yield f"ccx q[{controls[0]}],q[{controls[1]}],q[{targets[0]}];\n"
+        elif name == "MEASURE":
+            for t in targets:
+                yield f"measure q[{t}] -> c[{t}];\n"
+        elif name == "RESET":
+            for t in targets:
+                yield f"reset q[{t}];\n"
+        elif name == "BARRIER":
+            yield f"barrier {','.join(f'q[{i}]' for i in range(num_qubits))};\n"
@@ -1,14 +1,70 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 from typing import Any, Dict, List, Tuple
 
 import numpy as np
 from qiskit import QuantumCircuit
-from qiskit.quantum_info import Statevector, DensityMatrix, Pauli, partial_trace
+from qiskit.quantum_info import Statevector
 from qiskit_aer import Aer
 from qiskit_aer.noise import NoiseModel, pauli_error, amplitude_damping_error
 from qiskit import transpile
 
+from .statevector import run_statevector, PARALLEL_MIN_QUBITS
+
+
+# "double" runs on complex128; "single" runs the NumPy kernel and analysis in
+# complex64/float32, which is accurate to ~1e-7 per amplitude and halves memory.
+PRECISIONS: Dict[str, Any] = {"double": np.complex128, "single": np.complex64}
+DEFAULT_PRECISION = os.environ.get("QSV_PRECISION", "double")
+
+
+def resolve_dtype(precision: str | None = None) -> Any:
+    precision = precision or DEFAULT_PRECISION
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {sorted(PRECISIONS)}")
+    return PRECISIONS[precision]
+
+
+# Above this many qubits the planner switches "auto" requests to the MPS engine.
+DENSE_MAX_QUBITS = int(os.environ.get("QSV_DENSE_MAX_QUBITS", 24))
+METHODS = ("statevector", "mps")
+
+
+def plan_method(num_qubits: int, method: str | None = None) -> str:
+    """Engine for a request: ``method`` if given, otherwise dense up to ``DENSE_MAX_QUBITS``, then MPS."""
+    if method and method != "auto":
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}', expected one of {sorted(METHODS)} or 'auto'")
+        return method
+    return "statevector" if num_qubits <= DENSE_MAX_QUBITS else "mps"
+
+
+def _as_state(statevector: Any, dtype: Any = None) -> np.ndarray:
+    """Return the statevector as an array, keeping an existing complex dtype unless one is given."""
+    if dtype is None:
+        if isinstance(statevector, np.ndarray) and np.iscomplexobj(statevector):
+            return statevector
+        dtype = np.complex128
+    return np.asarray(statevector, dtype=dtype)
+
+
+def circuit_hash(num_qubits: int, gates: List[Dict[str, Any]]) -> str:
+    """Stable hash of a circuit, independent of step numbering and key order."""
+    canonical = [
+        {
+            'name': str(g.get('name', '')).upper(),
+            'targets': list(g.get('targets', [])),
+            'controls': list(g.get('controls', [])),
+            'params': [float(p) for p in g.get('params', [])],
+        }
+        for g in sorted(gates, key=lambda g: g.get('step', 0))
+    ]
+    blob = json.dumps({'qubits': num_qubits, 'gates': canonical}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
 
 def build_qiskit_circuit(num_qubits: int, gates: List[Dict[str, Any]]) -> QuantumCircuit:
     qc = QuantumCircuit(num_qubits, num_qubits)
@@ -117,26 +173,54 @@ def build_noise_model(bit_flip_prob: float | None, depolarizing_prob: float | No
     return nm
 
 
-def simulate_statevector(num_qubits: int, gates: List[Dict[str, Any]]) -> Tuple[List[complex], List[float]]:
-    qc = build_qiskit_circuit(num_qubits, gates)
-    qc_sv = qc.remove_final_measurements(inplace=False)
-    sv = Statevector.from_instruction(qc_sv)
-    state = sv.data.astype(np.complex128)
+def evolve_statevector(num_qubits: int, gates: List[Dict[str, Any]], precision: str | None = None) -> np.ndarray:
+    """Final statevector as an array in the dtype selected by ``precision``."""
+    dtype = resolve_dtype(precision)
+    # Large states go to the NumPy kernel, which spreads each gate over the
+    # kernel thread pool; Qiskit's Statevector evolves on a single core.
+    if dtype == np.complex128 and num_qubits < PARALLEL_MIN_QUBITS:
+        qc = build_qiskit_circuit(num_qubits, gates)
+        qc_sv = qc.remove_final_measurements(inplace=False)
+        sv = Statevector.from_instruction(qc_sv)
+        return sv.data.astype(np.complex128)
+    return run_statevector(num_qubits, gates, dtype)
+
+
+def simulate_statevector(num_qubits: int, gates: List[Dict[str, Any]], precision: str | None = None) -> Tuple[List[complex], List[float]]:
+    state = evolve_statevector(num_qubits, gates, precision)
     probs = np.abs(state) ** 2
     return state.tolist(), probs.tolist()
 
 
-def simulate_counts(num_qubits: int, gates: List[Dict[str, Any]], shots: int, noise_model: NoiseModel | None = None) -> Dict[str, int]:
+def prepare_counts_circuit(
+    num_qubits: int,
+    gates: List[Dict[str, Any]],
+    noise_model: NoiseModel | None = None,
+    measure_all: bool = False,
+) -> Tuple[Any, QuantumCircuit]:
+    """Aer backend and transpiled circuit for shot runs; build once, run many times.
+
+    With ``measure_all``, a payload without MEASURE gates has every qubit
+    measured at the end instead of producing no counts.
+    """
     qc = build_qiskit_circuit(num_qubits, gates)
     # Ensure measurements exist
     if not qc.cregs:
         qc.measure(range(num_qubits), range(num_qubits))
+    elif measure_all and not any(str(g.get('name', '')).upper() == "MEASURE" for g in gates):
+        qc.measure(range(num_qubits), range(num_qubits))
     backend = Aer.get_backend('aer_simulator')
     if noise_model is not None:
         backend.set_options(noise_model=noise_model)
     # Transpile for backend to avoid result key issues across versions
-    tqc = transpile(qc, backend)
-    job = backend.run(tqc, shots=shots)
+    return backend, transpile(qc, backend)
+
+
+def run_counts(backend: Any, tqc: QuantumCircuit, shots: int, seed: int | None = None) -> Dict[str, int]:
+    run_options: Dict[str, Any] = {'shots': shots}
+    if seed is not None:
+        run_options['seed_simulator'] = seed
+    job = backend.run(tqc, **run_options)
     result = job.result()
     # Try multiple ways to get counts robustly
     try:
@@ -159,60 +243,50 @@ def simulate_counts(num_qubits: int, gates: List[Dict[str, Any]], shots: int, no
             return {}
 
 
-def compute_density_matrix(statevector: List[complex]) -> List[List[complex]]:
-    sv = Statevector(np.array(statevector, dtype=np.complex128))
-    dm = DensityMatrix(sv)
-    return dm.data.tolist()
+def simulate_counts(num_qubits: int, gates: List[Dict[str, Any]], shots: int, noise_model: NoiseModel | None = None, seed: int | None = None) -> Dict[str, int]:
+    backend, tqc = prepare_counts_circuit(num_qubits, gates, noise_model)
+    return run_counts(backend, tqc, shots, seed)
+
+
+def compute_density_matrix(statevector: List[complex], dtype: Any = None) -> List[List[complex]]:
+    sv = _as_state(statevector, dtype)
+    return np.outer(sv, sv.conj()).tolist()
 
 
-def _pauli_string(num_qubits: int, target: int, axis: str) -> Pauli:
-    axis_map = { 'X': 'X', 'Y': 'Y', 'Z': 'Z' }
-    s = ''.join(axis_map[axis] if i == target else 'I' for i in range(num_qubits))
-    return Pauli(s)
+def _single_qubit_components(sv: np.ndarray, num_qubits: int, qubit: int) -> Tuple[float, float, float]:
+    """<X>, <Y>, <Z> of one qubit from the two halves of the state split on its bit."""
+    view = sv.reshape(2 ** (num_qubits - 1 - qubit), 2, 2 ** qubit)
+    a0 = view[:, 0, :]
+    a1 = view[:, 1, :]
+    # rho_10 = sum(conj(a0) * a1); <X> = 2 Re rho_10, <Y> = 2 Im rho_10
+    rho_10 = np.vdot(a0, a1)
+    z = np.vdot(a0, a0).real - np.vdot(a1, a1).real
+    return float(2 * rho_10.real), float(2 * rho_10.imag), float(z)
 
 
-def compute_expectations_xyz(statevector: List[complex], num_qubits: int) -> Dict[str, List[float]]:
-    sv = Statevector(np.array(statevector, dtype=np.complex128))
+def compute_expectations_xyz(statevector: List[complex], num_qubits: int, dtype: Any = None) -> Dict[str, List[float]]:
+    sv = _as_state(statevector, dtype)
     xs: List[float] = []
     ys: List[float] = []
     zs: List[float] = []
     for q in range(num_qubits):
-        px = _pauli_string(num_qubits, q, 'X')
-        py = _pauli_string(num_qubits, q, 'Y')
-        pz = _pauli_string(num_qubits, q, 'Z')
-        xs.append(float(np.real(sv.expectation_value(px))))
-        ys.append(float(np.real(sv.expectation_value(py))))
-        zs.append(float(np.real(sv.expectation_value(pz))))
+        x, y, z = _single_qubit_components(sv, num_qubits, q)
+        xs.append(x)
+        ys.append(y)
+        zs.append(z)
     return { 'X': xs, 'Y': ys, 'Z': zs }
 
 
-def compute_single_qubit_bloch_vectors(statevector: List[complex], num_qubits: int) -> List[Dict[str, float]]:
+def compute_single_qubit_bloch_vectors(statevector: List[complex], num_qubits: int, dtype: Any = None) -> List[Dict[str, float]]:
     """Compute Bloch sphere coordinates for each qubit by tracing out others."""
-    sv = Statevector(np.array(statevector, dtype=np.complex128))
-    dm = DensityMatrix(sv)
-    
+    sv = _as_state(statevector, dtype)
+
     bloch_vectors = []
     for qubit_idx in range(num_qubits):
-        # Trace out all qubits except the target one
-        other_qubits = [i for i in range(num_qubits) if i != qubit_idx]
-        if other_qubits:
-            reduced_dm = partial_trace(dm, other_qubits)
-        else:
-            reduced_dm = dm
-        
-        # Convert to numpy array for Pauli matrix calculations
-        rho = np.array(reduced_dm.data)
-        
-        # Pauli matrices
-        pauli_x = np.array([[0, 1], [1, 0]], dtype=complex)
-        pauli_y = np.array([[0, -1j], [1j, 0]], dtype=complex)
-        pauli_z = np.array([[1, 0], [0, -1]], dtype=complex)
-        
-        # Bloch vector components
-        bx = float(np.real(np.trace(rho @ pauli_x)))
-        by = float(np.real(np.trace(rho @ pauli_y)))
-        bz = float(np.real(np.trace(rho @ pauli_z)))
-        
+        # The reduced state of one qubit only needs the overlaps of the two
+        # halves of the statevector, not the full density matrix.
+        bx, by, bz = _single_qubit_components(sv, num_qubits, qubit_idx)
+
         bloch_vectors.append({
             'x': bx,
             'y': by, 
@@ -224,10 +298,10 @@ def compute_single_qubit_bloch_vectors(statevector: List[complex], num_qubits: i
     return bloch_vectors
 
 
-def compute_circuit_fidelity(statevector1: List[complex], statevector2: List[complex]) -> float:
+def compute_circuit_fidelity(statevector1: List[complex], statevector2: List[complex], dtype: Any = None) -> float:
     """Compute fidelity between two quantum states."""
-    sv1 = np.array(statevector1, dtype=np.complex128)
-    sv2 = np.array(statevector2, dtype=np.complex128)
+    sv1 = _as_state(statevector1, dtype)
+    sv2 = _as_state(statevector2, dtype)
     
     # Normalize states
     sv1 = sv1 / (np.linalg.norm(sv1) + 1e-12)
@@ -238,23 +312,22 @@ def compute_circuit_fidelity(statevector1: List[complex], statevector2: List[com
     return fidelity
 
 
-def compute_entanglement_entropy(statevector: List[complex], num_qubits: int, partition: List[int]) -> float:
+def compute_entanglement_entropy(statevector: List[complex], num_qubits: int, partition: List[int], dtype: Any = None) -> float:
     """Compute entanglement entropy for a given partition of qubits."""
     if not partition or len(partition) >= num_qubits:
         return 0.0
         
-    sv = Statevector(np.array(statevector, dtype=np.complex128))
-    dm = DensityMatrix(sv)
+    sv = _as_state(statevector, dtype)
     
-    # Trace out qubits not in partition
-    trace_out = [i for i in range(num_qubits) if i not in partition]
-    if trace_out:
-        reduced_dm = partial_trace(dm, trace_out)
-    else:
-        reduced_dm = dm
+    # Group the partition's axes together; the squared singular values of the
+    # resulting matrix are the eigenvalues of the reduced density matrix.
+    axes = [num_qubits - 1 - q for q in partition]
+    rest = [a for a in range(num_qubits) if a not in axes]
+    psi = np.transpose(sv.reshape((2,) * num_qubits), rest + axes)
+    psi = psi.reshape(2 ** len(rest), 2 ** len(axes))
     
     # Compute eigenvalues
-    eigenvals = np.linalg.eigvals(reduced_dm.data)
+    eigenvals = np.linalg.svd(psi, compute_uv=False) ** 2
     eigenvals = eigenvals[eigenvals > 1e-12]  # Remove near-zero eigenvalues
     
     # Compute von Neumann entropy
@@ -262,24 +335,28 @@ def compute_entanglement_entropy(statevector: List[complex], num_qubits: int, pa
     return float(entropy)
 
 
-def analyze_circuit_properties(statevector: List[complex], num_qubits: int) -> Dict[str, Any]:
+def compute_cut_entropies(statevector: List[complex], num_qubits: int, dtype: Any = None) -> Dict[str, float]:
+    """Entropy of qubits 0..i-1 against the rest, for every cut ``cut_i``."""
+    sv_array = _as_state(statevector, dtype)
+    entanglement_entropies = {}
+    for i in range(1, num_qubits):
+        partition = list(range(i))
+        entanglement_entropies[f'cut_{i}'] = compute_entanglement_entropy(sv_array, num_qubits, partition)
+    return entanglement_entropies
+
+
+def analyze_circuit_properties(statevector: List[complex], num_qubits: int, dtype: Any = None) -> Dict[str, Any]:
     """Comprehensive analysis of quantum circuit properties."""
-    sv_array = np.array(statevector, dtype=np.complex128)
+    sv_array = _as_state(statevector, dtype)
     
     # Basic properties
     probabilities = (np.abs(sv_array) ** 2).tolist()
     
     # Bloch vectors for each qubit
-    bloch_vectors = compute_single_qubit_bloch_vectors(statevector, num_qubits)
+    bloch_vectors = compute_single_qubit_bloch_vectors(sv_array, num_qubits)
     
     # Entanglement measures
-    entanglement_entropies = {}
-    if num_qubits > 1:
-        # Bipartite entanglement for different cuts
-        for i in range(1, num_qubits):
-            partition = list(range(i))
-            entropy = compute_entanglement_entropy(statevector, num_qubits, partition)
-            entanglement_entropies[f'cut_{i}'] = entropy
+    entanglement_entropies = compute_cut_entropies(sv_array, num_qubits)
     
     # Participation ratio (measure of localization)
     participation_ratio = 1.0 / np.sum(np.array(probabilities) ** 2) if probabilities else 1.0
@@ -291,3 +368,22 @@ def analyze_circuit_properties(statevector: List[complex], num_qubits: int) -> D
         'participation_ratio': float(participation_ratio),
         'num_nonzero_amplitudes': int(np.sum(np.abs(sv_array) > 1e-12))
     }
+
+
+def compute_state_analytics(statevector: List[complex], num_qubits: int, dtype: Any = None) -> Dict[str, Any]:
+    """The analytics block served by ``/api/analysis`` for a circuit's final state."""
+    sv_array = _as_state(statevector, dtype)
+    circuit_analysis = analyze_circuit_properties(sv_array, num_qubits)
+    bloch_vectors = circuit_analysis["bloch_vectors"]
+    return {
+        "fidelity": None,
+        "expectation_values": {
+            'X': [bv['x'] for bv in bloch_vectors],
+            'Y': [bv['y'] for bv in bloch_vectors],
+            'Z': [bv['z'] for bv in bloch_vectors],
+        },
+        "entanglement_entropy": None,
+        "bloch_vectors": bloch_vectors,
+        "entanglement_entropies": circuit_analysis["entanglement_entropies"],
+        "participation_ratio": circuit_analysis["participation_ratio"],
+    }
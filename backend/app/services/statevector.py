@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+
+# Kernel threads are one process-wide pool shared by every request, so
+# concurrent simulations split these cores instead of multiplying threads.
+SIM_THREADS = int(os.environ.get("QSV_SIM_THREADS", 0)) or (os.cpu_count() or 1)
+# Below this size a gate is a few hundred microseconds of work and thread
+# hand-off costs more than it saves.
+PARALLEL_MIN_QUBITS = int(os.environ.get("QSV_PARALLEL_MIN_QUBITS", 20))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_kernel_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SIM_THREADS, thread_name_prefix="qsv-kernel")
+        return _executor
+
+
+class GateOp(NamedTuple):
+    """A primitive operation on the statevector.
+
+    ``kind`` is ``"unitary"`` (a 2x2 ``matrix`` on ``targets[0]``, applied where
+    every qubit in ``controls`` is 1), ``"swap"`` (exchange ``targets[0]`` and
+    ``targets[1]``) or ``"reset"`` (return ``targets[0]`` to |0>).
+    """
+    kind: str
+    targets: Tuple[int, ...]
+    controls: Tuple[int, ...] = ()
+    matrix: np.ndarray | None = None
+
+
+_SQRT1_2 = 1 / np.sqrt(2)
+
+_FIXED_MATRICES: Dict[str, np.ndarray] = {
+    "X": np.array([[0, 1], [1, 0]], dtype=np.complex128),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=np.complex128),
+    "Z": np.array([[1, 0], [0, -1]], dtype=np.complex128),
+    "H": np.array([[_SQRT1_2, _SQRT1_2], [_SQRT1_2, -_SQRT1_2]], dtype=np.complex128),
+    "S": np.array([[1, 0], [0, 1j]], dtype=np.complex128),
+    "T": np.array([[1, 0], [0, np.exp(1j * np.pi / 4)]], dtype=np.complex128),
+}
+
+
+def _rx(theta: float) -> np.ndarray:
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -1j * s], [-1j * s, c]], dtype=np.complex128)
+
+
+def _ry(theta: float) -> np.ndarray:
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -s], [s, c]], dtype=np.complex128)
+
+
+def _rz(theta: float) -> np.ndarray:
+    return np.array([[np.exp(-0.5j * theta), 0], [0, np.exp(0.5j * theta)]], dtype=np.complex128)
+
+
+def _u(theta: float, phi: float, lam: float) -> np.ndarray:
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array(
+        [[c, -np.exp(1j * lam) * s], [np.exp(1j * phi) * s, np.exp(1j * (phi + lam)) * c]],
+        dtype=np.complex128,
+    )
+
+
+def _phase(lam: float) -> np.ndarray:
+    return np.array([[1, 0], [0, np.exp(1j * lam)]], dtype=np.complex128)
+
+
+_ROTATIONS = {"RX": _rx, "RY": _ry, "RZ": _rz}
+
+
+def iter_gate_ops(gates: List[Dict[str, Any]]) -> Iterator[GateOp]:
+    """Expand gate dicts into primitive operations.
+
+    Mirrors ``build_qiskit_circuit``: gates are ordered by ``step``, unknown
+    names and gates without targets are skipped, and MEASURE/BARRIER are no-ops
+    for the pure-state evolution.
+    """
+    for g in sorted(gates, key=lambda g: g.get('step', 0)):
+        name = g.get('name')
+        targets: List[int] = g.get('targets', [])
+        controls: List[int] = g.get('controls', [])
+        params: List[float] = g.get('params', [])
+
+        if name is None or not targets:
+            continue
+        name = name.upper()
+        theta = params[0] if params else 0.0
+
+        if name in _FIXED_MATRICES:
+            for t in targets:
+                yield GateOp("unitary", (t,), (), _FIXED_MATRICES[name])
+        elif name in _ROTATIONS:
+            m = _ROTATIONS[name](theta)
+            for t in targets:
+                yield GateOp("unitary", (t,), (), m)
+        elif name in {"U", "U3"}:
+            m = _u(*(params + [0.0, 0.0, 0.0])[:3])
+            for t in targets:
+                yield GateOp("unitary", (t,), (), m)
+        elif name in {"P", "PHASE", "U1"}:
+            m = _phase(theta)
+            for t in targets:
+                yield GateOp("unitary", (t,), (), m)
+        elif name == "U2":
+            phi = params[0] if len(params) > 0 else 0.0
+            lam = params[1] if len(params) > 1 else 0.0
+            m = _u(np.pi / 2, phi, lam)
+            for t in targets:
+                yield GateOp("unitary", (t,), (), m)
+        elif name in {"CX", "CNOT", "CZ"}:
+            m = _FIXED_MATRICES["X" if name != "CZ" else "Z"]
+            for ctrl in controls:
+                for t in targets:
+                    yield GateOp("unitary", (t,), (ctrl,), m)
+        elif name in {"CRX", "CRY", "CRZ"}:
+            m = _ROTATIONS[name[1:]](theta)
+            for ctrl in controls:
+                for t in targets:
+                    yield GateOp("unitary", (t,), (ctrl,), m)
+        elif name == "SWAP":
+            if len(targets) >= 2:
+                yield GateOp("swap", (targets[0], targets[1]))
+        elif name in {"CCX", "TOFFOLI"}:
+            if len(controls) >= 2:
+                yield GateOp("unitary", (targets[0],), (controls[0], controls[1]), _FIXED_MATRICES["X"])
+        elif name == "RESET":
+            for t in targets:
+                yield GateOp("reset", (t,))
+
+
+def _axis(num_qubits: int, qubit: int) -> int:
+    # Qiskit is little-endian: qubit q is bit q of the basis index, which is
+    # axis n-1-q of the C-ordered (2,)*n tensor.
+    return num_qubits - 1 - qubit
+
+
+def _index(num_qubits: int, fixed: Dict[int, int]) -> Tuple[Any, ...]:
+    # Length-1 slices rather than integers so the result is always a view,
+    # even when every axis is fixed.
+    idx: List[Any] = [slice(None)] * num_qubits
+    for q, bit in fixed.items():
+        idx[_axis(num_qubits, q)] = slice(bit, bit + 1)
+    return tuple(idx)
+
+
+def apply_gate_op(tensor: np.ndarray, op: GateOp, num_qubits: int, rng: np.random.Generator | None = None) -> None:
+    """Apply ``op`` in place to ``tensor``, a ``(2,)*num_qubits`` view of the state.
+
+    Length-1 slices of the tensor are also accepted, which lets callers process
+    independent blocks of a larger state with the same kernel.
+    """
+    if op.kind == "unitary":
+        fixed = {c: 1 for c in op.controls}
+        t = op.targets[0]
+        a0 = tensor[_index(num_qubits, {**fixed, t: 0})]
+        a1 = tensor[_index(num_qubits, {**fixed, t: 1})]
+        m = op.matrix
+        if m[0, 1] == 0 and m[1, 0] == 0:
+            if m[0, 0] != 1:
+                a0 *= m[0, 0]
+            if m[1, 1] != 1:
+                a1 *= m[1, 1]
+        elif m[0, 0] == 0 and m[1, 1] == 0 and m[0, 1] == 1 and m[1, 0] == 1:
+            tmp = a0.copy()
+            a0[...] = a1
+            a1[...] = tmp
+        else:
+            tmp = m[0, 0] * a0 + m[0, 1] * a1
+            a1 *= m[1, 1]
+            a1 += m[1, 0] * a0
+            a0[...] = tmp
+    elif op.kind == "swap":
+        a, b = op.targets
+        if a == b:
+            return
+        v01 = tensor[_index(num_qubits, {a: 0, b: 1})]
+        v10 = tensor[_index(num_qubits, {a: 1, b: 0})]
+        tmp = v01.copy()
+        v01[...] = v10
+        v10[...] = tmp
+    elif op.kind == "reset":
+        t = op.targets[0]
+        a0 = tensor[_index(num_qubits, {t: 0})]
+        a1 = tensor[_index(num_qubits, {t: 1})]
+        p1 = float(np.vdot(a1, a1).real)
+        p0 = float(np.vdot(a0, a0).real)
+        rng = rng or np.random.default_rng()
+        # Like Qiskit's Statevector.reset: collapse on a sampled outcome, then
+        # rotate the survivor back to |0>.
+        if rng.random() * (p0 + p1) < p1:
+            a0[...] = a1 / np.sqrt(p1)
+        else:
+            a0 /= np.sqrt(p0)
+        a1[...] = 0
+    else:
+        raise ValueError(f"Unknown operation kind: {op.kind}")
+
+
+def _chunk_indices(num_qubits: int, op: GateOp, num_chunks: int) -> List[Tuple[Any, ...]]:
+    """Split the state into independent blocks for ``op``.
+
+    Blocks are formed by fixing the highest qubits the operation does not
+    touch, so each block is a contiguous slab that contains every amplitude
+    pair the gate mixes, whatever the target/control strides are.
+    """
+    touched = set(op.targets) | set(op.controls)
+    free = [q for q in range(num_qubits - 1, -1, -1) if q not in touched]
+    split = free[:max(0, (num_chunks - 1).bit_length())]
+    return [
+        _index(num_qubits, dict(zip(split, bits)))
+        for bits in itertools.product((0, 1), repeat=len(split))
+    ]
+
+
+def apply_gate_op_parallel(
+    tensor: np.ndarray,
+    op: GateOp,
+    num_qubits: int,
+    threads: int,
+    rng: np.random.Generator | None = None,
+) -> None:
+    """Apply ``op`` across ``threads`` blocks on the shared kernel pool.
+
+    NumPy releases the GIL inside the elementwise loops, so the blocks run
+    concurrently. Reset needs the norm of the whole state and stays serial.
+    """
+    if threads <= 1 or op.kind == "reset":
+        apply_gate_op(tensor, op, num_qubits, rng)
+        return
+    executor = get_kernel_executor()
+    futures = [
+        executor.submit(apply_gate_op, tensor[idx], op, num_qubits)
+        for idx in _chunk_indices(num_qubits, op, threads)
+    ]
+    for f in futures:
+        f.result()
+
+
+def iter_step_states(
+    num_qubits: int,
+    gates: List[Dict[str, Any]],
+    dtype: Any = np.complex128,
+    threads: int | None = None,
+) -> Iterator[Tuple[Any, np.ndarray]]:
+    """Evolve |0...0> one ``step`` group at a time, yielding ``(step, state)``.
+
+    The initial state is yielded first with step ``None``. The same array is
+    updated in place, so read it before advancing the iterator. States of
+    ``PARALLEL_MIN_QUBITS`` or more qubits use up to ``threads`` kernel threads
+    (default ``SIM_THREADS``).
+    """
+    if threads is None:
+        threads = SIM_THREADS if num_qubits >= PARALLEL_MIN_QUBITS else 1
+    threads = min(threads, SIM_THREADS)
+    state = np.zeros(2 ** num_qubits, dtype=dtype)
+    state[0] = 1
+    tensor = state.reshape((2,) * num_qubits)
+    rng = np.random.default_rng()
+    yield None, state
+    ordered = sorted(gates, key=lambda g: g.get('step', 0))
+    for step, group in itertools.groupby(ordered, key=lambda g: g.get('step', 0)):
+        for op in iter_gate_ops(list(group)):
+            if op.matrix is not None and op.matrix.dtype != state.dtype:
+                op = op._replace(matrix=op.matrix.astype(state.dtype))
+            apply_gate_op_parallel(tensor, op, num_qubits, threads, rng)
+        yield step, state
+
+
+def run_statevector(
+    num_qubits: int,
+    gates: List[Dict[str, Any]],
+    dtype: Any = np.complex128,
+    threads: int | None = None,
+) -> np.ndarray:
+    """Evolve |0...0> through ``gates`` with the NumPy kernel in the given dtype."""
+    state = None
+    for _, state in iter_step_states(num_qubits, gates, dtype, threads):
+        pass
+    return state
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from .simulator import compute_single_qubit_bloch_vectors, compute_cut_entropies
+from .statevector import iter_step_states
+
+
+TRAJECTORY_OUTPUTS = ("probabilities", "bloch_vectors", "entropies", "statevector")
+
+
+def iter_trajectory(
+    num_qubits: int,
+    gates: List[Dict[str, Any]],
+    outputs: Sequence[str] = ("probabilities", "bloch_vectors"),
+    every: int = 1,
+    max_frames: int | None = None,
+    dtype: Any = np.complex128,
+) -> Iterator[Dict[str, Any]]:
+    """Frames of the state after each ``step`` group, from one simulation.
+
+    Frame 0 is the initial state. With ``every``/``max_frames`` only every
+    k-th step produces a frame (the final step always does); skipped steps are
+    still simulated but nothing is computed for them.
+    """
+    num_steps = len({g.get('step', 0) for g in gates})
+    if max_frames:
+        every = max(every, math.ceil(num_steps / max(1, max_frames - 1)))
+    every = max(1, every)
+
+    frame = 0
+    for index, (step, state) in enumerate(iter_step_states(num_qubits, gates, dtype)):
+        if index % every and index != num_steps:
+            continue
+        out: Dict[str, Any] = {"frame": frame, "step": step, "steps_applied": index}
+        if "probabilities" in outputs:
+            out["probabilities"] = (np.abs(state) ** 2).tolist()
+        if "bloch_vectors" in outputs:
+            out["bloch_vectors"] = compute_single_qubit_bloch_vectors(state, num_qubits)
+        if "entropies" in outputs:
+            out["entanglement_entropies"] = compute_cut_entropies(state, num_qubits)
+        if "statevector" in outputs:
+            out["statevector"] = np.stack([state.real, state.imag], axis=-1).tolist()
+        yield out
+        frame += 1
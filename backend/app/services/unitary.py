@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .simulator import circuit_hash
+from .statevector import SIM_THREADS, PARALLEL_MIN_QUBITS, apply_gate_op_parallel, iter_gate_ops
+
+
+# A 12-qubit complex128 unitary is 256 MiB.
+UNITARY_MAX_QUBITS = int(os.environ.get("QSV_UNITARY_MAX_QUBITS", 12))
+UNITARY_CACHE_MB = int(os.environ.get("QSV_UNITARY_CACHE_MB", 512))
+# Unless return_matrix is set, the matrix is only returned up to this many qubits (256x256).
+UNITARY_RETURN_MAX_QUBITS = int(os.environ.get("QSV_UNITARY_RETURN_MAX_QUBITS", 8))
+
+
+def build_unitary(num_qubits: int, gates: List[Dict[str, Any]], dtype: Any = np.complex128) -> np.ndarray:
+    """Circuit unitary, built by evolving every basis state at once.
+
+    Column ``j`` of the identity is |j>; viewing the matrix as a
+    ``(2,)*n + (2**n,)`` tensor lets the statevector kernel act on all
+    columns in each gate application.
+    """
+    if num_qubits > UNITARY_MAX_QUBITS:
+        raise ValueError(f"Unitaries are limited to {UNITARY_MAX_QUBITS} qubits")
+    dim = 2 ** num_qubits
+    unitary = np.eye(dim, dtype=dtype)
+    tensor = unitary.reshape((2,) * num_qubits + (dim,))
+    threads = SIM_THREADS if 2 * num_qubits >= PARALLEL_MIN_QUBITS else 1
+    for op in iter_gate_ops(gates):
+        if op.kind == "reset":
+            raise ValueError("Circuits with RESET have no unitary")
+        if op.matrix is not None and op.matrix.dtype != unitary.dtype:
+            op = op._replace(matrix=op.matrix.astype(unitary.dtype))
+        apply_gate_op_parallel(tensor, op, num_qubits, threads)
+    return unitary
+
+
+class UnitaryCache:
+    """LRU cache of circuit unitaries keyed by circuit hash and dtype, bounded in bytes."""
+
+    def __init__(self, max_mb: int = UNITARY_CACHE_MB):
+        self._max_bytes = max_mb * 2 ** 20
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, num_qubits: int, gates: List[Dict[str, Any]], dtype: Any = np.complex128) -> Tuple[str, np.ndarray, bool]:
+        """Return ``(hash, unitary, was_cached)``; the unitary is read-only."""
+        digest = circuit_hash(num_qubits, gates)
+        key = (digest, np.dtype(dtype).name)
+        with self._lock:
+            unitary = self._entries.get(key)
+            if unitary is not None:
+                self._entries.move_to_end(key)
+                return digest, unitary, True
+
+        unitary = build_unitary(num_qubits, gates, dtype)
+        unitary.setflags(write=False)
+        with self._lock:
+            if key not in self._entries and unitary.nbytes <= self._max_bytes:
+                self._entries[key] = unitary
+                self._bytes += unitary.nbytes
+                while self._bytes > self._max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+        return digest, unitary, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+unitary_cache = UnitaryCache()
+
+
+def apply_unitary(unitary: np.ndarray, states: Any) -> np.ndarray:
+    """Apply ``unitary`` to a batch of statevectors (one per row) with a single matmul."""
+    batch = np.asarray(states, dtype=unitary.dtype)
+    if batch.ndim != 2 or batch.shape[1] != unitary.shape[0]:
+        raise ValueError(f"Input states must have {unitary.shape[0]} amplitudes each")
+    return batch @ unitary.T
+
+
+def process_fidelity(unitary: np.ndarray, target: np.ndarray) -> float:
+    """|Tr(U^dagger V)|^2 / d^2 between two unitaries of the same size."""
+    dim = unitary.shape[0]
+    overlap = np.vdot(unitary, target)  # Tr(U^dagger V) as a flat inner product
+    return float(np.abs(overlap) ** 2 / dim ** 2)
+
+
+def average_gate_fidelity(unitary: np.ndarray, target: np.ndarray) -> float:
+    dim = unitary.shape[0]
+    return (dim * process_fidelity(unitary, target) + 1) / (dim + 1)
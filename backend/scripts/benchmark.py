@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""Simulator benchmarks and self-checks.
+
+Run from ``backend/``:
+
+    python scripts/benchmark.py precision --qubits 16 --depth 40
+    QSV_SIM_THREADS=16 python scripts/benchmark.py parallel --qubits 24 --depth 4
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.simulator import evolve_statevector, compute_circuit_fidelity  # noqa: E402
+from app.services.statevector import run_statevector, SIM_THREADS  # noqa: E402
+
+SINGLE_QUBIT = ["H", "X", "Y", "Z", "S", "T", "RX", "RY", "RZ"]
+
+
+def random_circuit(num_qubits: int, depth: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """A layered circuit of random single-qubit gates followed by a CNOT ladder."""
+    rng = random.Random(seed)
+    gates: List[Dict[str, Any]] = []
+    for layer in range(depth):
+        for q in range(num_qubits):
+            gates.append({
+                "name": rng.choice(SINGLE_QUBIT),
+                "targets": [q],
+                "params": [rng.uniform(0, 2 * np.pi)],
+                "step": 2 * layer,
+            })
+        for q in range(layer % 2, num_qubits - 1, 2):
+            gates.append({"name": "CNOT", "controls": [q], "targets": [q + 1], "step": 2 * layer + 1})
+    return gates
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def bench_precision(args: argparse.Namespace) -> int:
+    """Compare complex64 against complex128 and fail if the error bound is exceeded."""
+    gates = random_circuit(args.qubits, args.depth, args.seed)
+    double, t_double = timed(lambda: evolve_statevector(args.qubits, gates, "double"), args.repeat)
+    single, t_single = timed(lambda: evolve_statevector(args.qubits, gates, "single"), args.repeat)
+
+    infidelity = 1.0 - compute_circuit_fidelity(double, single, dtype=np.complex128)
+    max_amp_err = float(np.max(np.abs(double - single)))
+    max_prob_err = float(np.max(np.abs(np.abs(double) ** 2 - np.abs(single) ** 2)))
+    print(f"qubits={args.qubits} depth={args.depth} gates={len(gates)}")
+    print(f"double: {t_double * 1e3:9.2f} ms  {double.nbytes / 2**20:8.1f} MiB")
+    print(f"single: {t_single * 1e3:9.2f} ms  {single.nbytes / 2**20:8.1f} MiB")
+    print(f"infidelity={infidelity:.3e} max|d amp|={max_amp_err:.3e} max|d prob|={max_prob_err:.3e}")
+
+    ok = infidelity <= args.tolerance
+    print("fidelity check:", "PASS" if ok else f"FAIL (> {args.tolerance:g})")
+    return 0 if ok else 1
+
+
+def bench_parallel(args: argparse.Namespace) -> int:
+    """Time the NumPy kernel at 1, 2, 4, ... threads up to QSV_SIM_THREADS."""
+    gates = random_circuit(args.qubits, args.depth, args.seed)
+    dtype = np.complex64 if args.precision == "single" else np.complex128
+    print(f"qubits={args.qubits} depth={args.depth} gates={len(gates)} precision={args.precision}")
+
+    reference = None
+    baseline = None
+    threads = 1
+    while threads <= SIM_THREADS:
+        state, elapsed = timed(lambda: run_statevector(args.qubits, gates, dtype, threads=threads), args.repeat)
+        if reference is None:
+            reference, baseline = state, elapsed
+        elif not np.allclose(state, reference, atol=1e-5):
+            print(f"threads={threads}: result differs from single-threaded run")
+            return 1
+        print(f"threads={threads:3d}: {elapsed:8.3f} s  speedup {baseline / elapsed:5.2f}x")
+        threads *= 2
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("precision", help="complex64 vs complex128 speed, memory and fidelity")
+    p.add_argument("--qubits", type=int, default=16)
+    p.add_argument("--depth", type=int, default=40)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--tolerance", type=float, default=1e-5, help="maximum allowed 1 - fidelity")
+    p.set_defaults(func=bench_precision)
+
+    p = sub.add_parser("parallel", help="multi-threaded gate application scaling")
+    p.add_argument("--qubits", type=int, default=22)
+    p.add_argument("--depth", type=int, default=4)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--precision", choices=["single", "double"], default="double")
+    p.set_defaults(func=bench_parallel)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())